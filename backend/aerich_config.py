@@ -1,11 +1,20 @@
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
+from app.utils.db import with_statement_cache
+
+
+@lru_cache(maxsize=1)
+def _database_url():
+    """Resolve DATABASE_URL, only parsing .env when the process manager didn't inject it"""
+    if "DATABASE_URL" not in os.environ:
+        load_dotenv()
+    return os.getenv("DATABASE_URL")
 
-load_dotenv()
 
 TORTOISE_ORM = {
     "connections": {
-        "default": os.getenv("DATABASE_URL")
+        "default": with_statement_cache(_database_url())
     },
     "apps": {
         "models": {
@@ -0,0 +1,13 @@
+from tortoise_vector.field import VectorField
+
+
+class HalfVectorField(VectorField):
+    """pgvector `halfvec` column - float16 storage at half the size of `vector`.
+
+    Values use the same text representation as `vector`, so (de)serialization is
+    inherited unchanged; Postgres does the float32 <-> float16 conversion.
+    """
+
+    @property
+    def SQL_TYPE(self) -> str:
+        return f"halfvec({self.vector_size})"
@@ -1,11 +1,26 @@
 from tortoise import fields
 from tortoise.models import Model
+from tortoise.contrib.postgres.fields import ArrayField
+from tortoise.contrib.postgres.indexes import GinIndex
 from uuid import uuid4
+import hashlib
+
+
+def hash_token(token: str) -> str:
+    """SHA-256 hex digest used as the compact lookup key for a token"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def token_prefix(token: str) -> str:
+    """Short display prefix taken from the JWT signature (the header segment is the same for every token)"""
+    return token.rsplit(".", 1)[-1][:8]
 
 
 class OAuthAccessToken(Model):
     id = fields.UUIDField(pk=True, default=uuid4)
-    token = fields.CharField(max_length=500, unique=True)  # JWT token
+    token = fields.CharField(max_length=500)  # JWT token
+    token_hash = fields.CharField(max_length=64, unique=True)  # SHA-256 of token, used for lookups
+    token_prefix = fields.CharField(max_length=12, index=True)  # First characters of the token signature, for display/search
     
     client = fields.ForeignKeyField(
         "models.OAuthClient", related_name="access_tokens"
@@ -14,7 +29,7 @@ class OAuthAccessToken(Model):
         "models.User", related_name="oauth_access_tokens"
     )
     
-    scopes = fields.JSONField()  # List of granted scopes
+    scopes = ArrayField(element_type="text")  # List of granted scopes
     expires_at = fields.DatetimeField()
     created_at = fields.DatetimeField(auto_now_add=True)
     
@@ -23,6 +38,14 @@ class OAuthAccessToken(Model):
 
     class Meta:
         table = "oauth_access_tokens"
+        indexes = (("client_id", "user_id"), ("expires_at",), GinIndex(fields=("scopes",)))
+
+    async def save(self, *args, update_fields=None, **kwargs):
+        self.token_hash = hash_token(self.token)
+        self.token_prefix = token_prefix(self.token)
+        if update_fields is not None and "token" in update_fields:
+            update_fields = [*update_fields, "token_hash", "token_prefix"]
+        await super().save(*args, update_fields=update_fields, **kwargs)
 
     def __str__(self):
-        return f"<OAuthAccessToken {self.token[:8]}...>"
\ No newline at end of file
+        return f"<OAuthAccessToken {self.token_prefix}...>"
\ No newline at end of file
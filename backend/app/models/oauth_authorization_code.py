@@ -1,5 +1,7 @@
 from tortoise import fields
 from tortoise.models import Model
+from tortoise.contrib.postgres.fields import ArrayField
+from tortoise.contrib.postgres.indexes import GinIndex
 
 
 class OAuthAuthorizationCode(Model):
@@ -13,7 +15,7 @@ class OAuthAuthorizationCode(Model):
     )
     
     redirect_uri = fields.CharField(max_length=500)
-    scopes = fields.JSONField()  # List of granted scopes
+    scopes = ArrayField(element_type="text")  # List of granted scopes
     
     # PKCE support
     code_challenge = fields.CharField(max_length=255, null=True)
@@ -24,6 +26,7 @@ class OAuthAuthorizationCode(Model):
 
     class Meta:
         table = "oauth_authorization_codes"
+        indexes = (("expires_at",), GinIndex(fields=("scopes",)))
 
     def __str__(self):
         return f"<OAuthAuthorizationCode {self.code[:8]}...>"
\ No newline at end of file
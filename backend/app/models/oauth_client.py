@@ -1,5 +1,7 @@
 from tortoise import fields
 from tortoise.models import Model
+from tortoise.contrib.postgres.fields import ArrayField
+from tortoise.contrib.postgres.indexes import GinIndex
 from uuid import uuid4
 
 
@@ -8,8 +10,8 @@ class OAuthClient(Model):
     name = fields.CharField(max_length=255)
     client_id = fields.CharField(max_length=255, unique=True)
     client_secret = fields.CharField(max_length=255)
-    redirect_uris = fields.JSONField()  # List of allowed redirect URIs
-    allowed_scopes = fields.JSONField()  # List of allowed scopes like ['read:preferences:food', 'write:preferences:all']
+    redirect_uris = ArrayField(element_type="text")  # List of allowed redirect URIs
+    allowed_scopes = ArrayField(element_type="text")  # List of allowed scopes like ['read:preferences:food', 'write:preferences:all']
     is_public = fields.BooleanField(default=False)  # PKCE public clients don't need secret
     
     # Link to existing App model for unified app management
@@ -25,6 +27,7 @@ class OAuthClient(Model):
 
     class Meta:
         table = "oauth_clients"
+        indexes = (GinIndex(fields=("allowed_scopes",)),)
 
     def __str__(self):
         return f"<OAuthClient {self.name}>"
\ No newline at end of file
@@ -1,5 +1,7 @@
 from tortoise import fields
 from tortoise.models import Model
+from tortoise.contrib.postgres.fields import ArrayField
+from tortoise.contrib.postgres.indexes import GinIndex
 from uuid import uuid4
 
 
@@ -17,7 +19,7 @@ class OAuthRefreshToken(Model):
         "models.OAuthAccessToken", related_name="refresh_tokens"
     )
     
-    scopes = fields.JSONField()  # List of granted scopes
+    scopes = ArrayField(element_type="text")  # List of granted scopes
     expires_at = fields.DatetimeField()
     created_at = fields.DatetimeField(auto_now_add=True)
     
@@ -26,6 +28,8 @@ class OAuthRefreshToken(Model):
 
     class Meta:
         table = "oauth_refresh_tokens"
+        # Partial index on (token, expires_at) WHERE revoked = false lives in migration 6
+        indexes = (GinIndex(fields=("scopes",)),)
 
     def __str__(self):
         return f"<OAuthRefreshToken {self.token[:8]}...>"
\ No newline at end of file
@@ -16,6 +16,7 @@ class PreferenceSource(Model):
     class Meta:
         table = "preference_sources"
         unique_together = ("preference_id", "app_id", "user_id")
+        indexes = (("user_id", "app_id"),)
 
     def __str__(self):
         app_name = "User" if not self.app_id else f"App {self.app_id}"
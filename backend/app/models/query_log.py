@@ -1,11 +1,11 @@
 from tortoise import fields
 from tortoise.models import Model
-from tortoise_vector.field import VectorField
+from app.models.fields import HalfVectorField
 
 
 class QueryLog(Model):
     id = fields.UUIDField(pk=True)
-    embedding = VectorField(vector_size=384)
+    embedding = HalfVectorField(vector_size=384)
     result = fields.FloatField(null=True)
     context = fields.CharField(max_length=500, null=True)
     noise_level = fields.FloatField(null=True)
@@ -18,6 +18,7 @@ class UserAppPermission(Model):
     class Meta:
         table = "user_app_permissions"
         unique_together = ("user_id", "app_id", "category_id")
+        # Partial unique index on (user_id, app_id) WHERE category_id IS NULL lives in migration 11
 
     def __str__(self):
         category = self.category_id or "All Categories"
@@ -1,12 +1,13 @@
+from functools import cached_property
 from tortoise import fields
 from tortoise.models import Model
-from tortoise_vector.field import VectorField
+from app.models.fields import HalfVectorField
 
 
 class UserPreference(Model):
     id = fields.UUIDField(pk=True)
     text = fields.TextField()
-    embedding = VectorField(vector_size=384)
+    embedding = HalfVectorField(vector_size=384)
     strength = fields.FloatField(default=1.0)
     
     created_at = fields.DatetimeField(auto_now_add=True)
@@ -19,7 +20,13 @@ class UserPreference(Model):
 
     class Meta:
         table = "user_preferences"
-        indexes = ["user_id", "category_id"]
+        # (user_id, category_id) lookups use the covering decay-rank index from migration 17
+        # HNSW index on binary_quantize(embedding) (bit_hamming_ops) lives in migration 13
+
+    @cached_property
+    def last_updated_epoch(self) -> float:
+        """last_updated as a POSIX timestamp, computed once per loaded row"""
+        return self.last_updated.timestamp()
 
     def __str__(self):
         return f"<UserPreference {self.text[:50]}...>"
\ No newline at end of file
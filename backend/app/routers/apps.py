@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Query, HTTPException, Request, Depends
+from tortoise.functions import Count
 from typing import Optional
 from app.schema.apps import (
     IntegratedAppsResponse,
@@ -11,89 +12,149 @@ from app.models.user_app_permission import UserAppPermission
 from app.models.preference_source import PreferenceSource
 from app.models.query_log import QueryLog
 from app.models.user_preference import UserPreference
-from app.models.preference_category import PreferenceCategory
+from app.utils.app_cache import get_app
+from app.utils.category_cache import get_category_by_slug
+from app.utils.response_cache import (
+    integrated_apps_cache,
+    app_stats_cache,
+    should_bypass_cache,
+    serialize_json,
+    json_response
+)
+from app.utils.clock import request_now
+import asyncio
 import secrets
-from datetime import datetime, timezone
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timedelta
 
 router = APIRouter(prefix="/apps", tags=["apps"])
 
 
+@dataclass(slots=True)
+class _PermissionAcc:
+    category_id: str
+    category_name: str
+    can_read: bool
+    can_write: bool
+
+
+@dataclass(slots=True)
+class _AppAcc:
+    """Per-app accumulator for get_integrated_apps"""
+    id: str
+    name: str
+    description: Optional[str]
+    is_active: bool
+    created_at: datetime
+    permissions_summary: dict = field(default_factory=dict)
+    permissions: list = field(default_factory=list)  # Frontend expects this array format
+    preferences_contributed: int = 0
+    queries_made: int = 0
+
+
 @router.get("/integrated", response_model=IntegratedAppsResponse)
 async def get_integrated_apps(
+    request: Request,
     user_id: str = Query(..., description="User ID"),
     limit: int = Query(20, ge=1, le=100, description="Number of apps to return"),
     active_only: bool = Query(True, description="Only return active apps")
 ):
     """Get all apps integrated with the user and their permission/usage summary"""
     
-    # Get apps that have permissions set for this user
-    permissions_query = UserAppPermission.filter(user_id=user_id).select_related('app', 'category')
+    cache_key = (user_id, limit, active_only)
+    if not should_bypass_cache(request):
+        cached = integrated_apps_cache.get(cache_key)
+        if cached is not None:
+            return json_response(cached)
+    
+    # Get the most recently created apps that have permissions set for this user,
+    # letting the database sort and apply the limit
+    apps_query = App.filter(permissions__user_id=user_id)
     
     if active_only:
-        permissions_query = permissions_query.filter(app__is_active=True)
+        apps_query = apps_query.filter(is_active=True)
     
-    permissions = await permissions_query.all()
+    # Total integrated apps, counted in the database from the user's permission rows
+    total_query = UserAppPermission.filter(user_id=user_id)
+    if active_only:
+        total_query = total_query.filter(app__is_active=True)
     
-    # Group permissions by app
-    apps_data = {}
+    top_apps, total_row = await asyncio.gather(
+        apps_query.distinct().order_by("-created_at").limit(limit).values(
+            "id", "name", "description", "is_active", "created_at"
+        ),
+        total_query.annotate(total=Count("app_id", distinct=True)).first().values("total")
+    )
+    
+    apps_data = {
+        app["id"]: _AppAcc(
+            id=str(app["id"]),
+            name=app["name"],
+            description=app["description"],
+            is_active=app["is_active"],
+            created_at=app["created_at"]
+        )
+        for app in top_apps
+    }
+    
+    # Get permissions and usage statistics for just these apps
+    app_ids = list(apps_data.keys())
+    permissions = []
+    pref_counts = {}
+    query_counts = {}
+    if app_ids:
+        permissions, pref_rows, query_rows = await asyncio.gather(
+            UserAppPermission.filter(
+                user_id=user_id,
+                app_id__in=app_ids
+            ).values(
+                "app_id", "category_id", "category__name", "category__slug", "can_read", "can_write"
+            ),
+            # Count preferences contributed by each app
+            PreferenceSource.filter(
+                user_id=user_id,
+                app_id__in=app_ids
+            ).annotate(c=Count("id")).group_by("app_id").values("app_id", "c"),
+            # Count queries made by each app for this user
+            QueryLog.filter(
+                user_id=user_id,
+                app_id__in=app_ids
+            ).annotate(c=Count("id")).group_by("app_id").values("app_id", "c")
+        )
+        pref_counts = {row["app_id"]: row["c"] for row in pref_rows}
+        query_counts = {row["app_id"]: row["c"] for row in query_rows}
     
+    # Group permissions by app
     for perm in permissions:
-        app = perm.app
-        if app.id not in apps_data:
-            apps_data[app.id] = {
-                "id": str(app.id),
-                "name": app.name,
-                "description": app.description,
-                "is_active": app.is_active,
-                "created_at": app.created_at,
-                "permissions_summary": {},
-                "permissions": [],  # Frontend expects this array format
-                "preferences_contributed": 0,
-                "queries_made": 0
-            }
+        app_acc = apps_data[perm["app_id"]]
+        has_category = perm["category_id"] is not None
         
         # Build permissions summary (for compatibility)
-        category_key = perm.category.slug if perm.category else "all"
-        apps_data[app.id]["permissions_summary"][category_key] = {
-            "can_read": perm.can_read,
-            "can_write": perm.can_write
+        category_key = perm["category__slug"] if has_category else "all"
+        app_acc.permissions_summary[category_key] = {
+            "can_read": perm["can_read"],
+            "can_write": perm["can_write"]
         }
         
         # Build permissions array for frontend
-        apps_data[app.id]["permissions"].append({
-            "category_id": str(perm.category.id) if perm.category else "all",
-            "category_name": perm.category.name if perm.category else "All Categories",
-            "can_read": perm.can_read,
-            "can_write": perm.can_write
-        })
+        app_acc.permissions.append(_PermissionAcc(
+            category_id=str(perm["category_id"]) if has_category else "all",
+            category_name=perm["category__name"] if has_category else "All Categories",
+            can_read=perm["can_read"],
+            can_write=perm["can_write"]
+        ))
     
-    # Get usage statistics for each app
-    for app_id, app_data in apps_data.items():
-        # Count preferences contributed by this app
-        contributed_count = await PreferenceSource.filter(
-            app_id=app_id,
-            user_id=user_id
-        ).count()
-        app_data["preferences_contributed"] = contributed_count
-        
-        # Count queries made by this app for this user
-        queries_count = await QueryLog.filter(
-            app_id=app_id,
-            user_id=user_id
-        ).count()
-        app_data["queries_made"] = queries_count
-    
-    # Sort by most recently created and apply limit
-    sorted_apps = sorted(
-        apps_data.values(),
-        key=lambda x: x["created_at"],
-        reverse=True
-    )[:limit]
-    
-    return IntegratedAppsResponse(
-        apps=sorted_apps,
-        total_count=len(apps_data)
+    for app_id, app_acc in apps_data.items():
+        app_acc.preferences_contributed = pref_counts.get(app_id, 0)
+        app_acc.queries_made = query_counts.get(app_id, 0)
+    
+    response = IntegratedAppsResponse(
+        apps=[asdict(app_acc) for app_acc in apps_data.values()],
+        total_count=total_row["total"] if total_row else 0
     )
+    body = serialize_json(response)
+    integrated_apps_cache.set(cache_key, body)
+    return json_response(body)
 
 
 @router.get("/{app_id}/preferences", response_model=AppContributedPreferencesResponse)
@@ -106,7 +167,7 @@ async def get_app_contributed_preferences(
     """Get preferences contributed by a specific app for a user"""
     
     # Verify app exists
-    app = await App.get_or_none(id=app_id)
+    app = await get_app(app_id)
     if not app:
         raise HTTPException(status_code=404, detail="App not found")
     
@@ -114,34 +175,32 @@ async def get_app_contributed_preferences(
     query = PreferenceSource.filter(
         app_id=app_id,
         user_id=user_id
-    ).select_related('preference__category').order_by('-added_at')
+    )
     
     # Apply category filter if specified
     if category:
-        category_obj = await PreferenceCategory.get_or_none(slug=category)
+        category_obj = await get_category_by_slug(category)
         if not category_obj:
             raise HTTPException(status_code=404, detail="Category not found")
         query = query.filter(preference__category_id=category_obj.id)
     
-    # Get sources with limit
-    sources = await query.limit(limit).all()
-    
-    # Get total count for pagination
-    total_query = PreferenceSource.filter(app_id=app_id, user_id=user_id)
-    if category:
-        total_query = total_query.filter(preference__category_id=category_obj.id)
-    total_count = await total_query.count()
+    # Get sources with limit and total count for pagination concurrently
+    sources, total_count = await asyncio.gather(
+        query.order_by('-added_at').limit(limit).values(
+            "preference_id", "preference__text", "preference__category__name", "strength", "added_at"
+        ),
+        query.count()
+    )
     
     # Build response
     preferences_data = []
     for source in sources:
-        pref = source.preference
         preferences_data.append({
-            "preference_id": str(pref.id),
-            "text": pref.text,
-            "strength": source.strength,
-            "added_at": source.added_at,
-            "category_name": pref.category.name if pref.category else None
+            "preference_id": str(source["preference_id"]),
+            "text": source["preference__text"],
+            "strength": source["strength"],
+            "added_at": source["added_at"],
+            "category_name": source["preference__category__name"]
         })
     
     return AppContributedPreferencesResponse(
@@ -179,57 +238,83 @@ async def create_app(
 
 @router.get("/{app_id}/stats")
 async def get_app_statistics(
+    request: Request,
     app_id: str,
-    user_id: str = Query(..., description="User ID")
+    user_id: str = Query(..., description="User ID"),
+    now: datetime = Depends(request_now)
 ):
     """Get detailed statistics for an app's integration with a user"""
     
-    # Verify app exists
-    app = await App.get_or_none(id=app_id)
-    if not app:
-        raise HTTPException(status_code=404, detail="App not found")
+    # Only the app, contribution and permission parts are cached (writes to them invalidate
+    # app_stats_cache); query counts change on every logged query, so they're always read fresh
+    cache_key = (user_id, app_id)
+    cached = None if should_bypass_cache(request) else app_stats_cache.get(cache_key)
+    if cached is None:
+        cached = await _cached_app_statistics(app_id, user_id)
+        if cached is None:
+            raise HTTPException(status_code=404, detail="App not found")
+        app_stats_cache.set(cache_key, cached)
     
-    # Get various statistics
-    total_queries = await QueryLog.filter(app_id=app_id, user_id=user_id).count()
-    total_contributions = await PreferenceSource.filter(app_id=app_id, user_id=user_id).count()
-    
-    # Get query statistics from the last 30 days
-    from datetime import timedelta
-    thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=30)
-    recent_queries = await QueryLog.filter(
-        app_id=app_id, 
-        user_id=user_id,
-        timestamp__gte=thirty_days_ago
-    ).count()
+    # Query statistics, overall and from the last 30 days
+    thirty_days_ago = now - timedelta(days=30)
+    total_queries, recent_queries = await asyncio.gather(
+        QueryLog.filter(app_id=app_id, user_id=user_id).count(),
+        QueryLog.filter(
+            app_id=app_id, 
+            user_id=user_id,
+            timestamp__gte=thirty_days_ago
+        ).count()
+    )
     
     # Calculate noise level (current)
     from app.routers.preferences import calculate_noise
-    current_noise = calculate_noise(total_queries, total_contributions)
+    current_noise = calculate_noise(total_queries, cached["total_contributions"])
+    
+    response = {
+        "app_name": cached["app_name"],
+        "app_id": cached["app_id"],
+        "is_active": cached["is_active"],
+        "statistics": {
+            "total_queries": total_queries,
+            "total_contributions": cached["total_contributions"],
+            "recent_queries_30d": recent_queries,
+            "current_noise_level": round(current_noise, 4),
+            "permissions_summary": cached["permissions_summary"]
+        },
+        "integration_date": cached["integration_date"]
+    }
+    return json_response(serialize_json(response))
+
+
+async def _cached_app_statistics(app_id: str, user_id: str) -> Optional[dict]:
+    """The parts of an app's statistics that only change on writes invalidating app_stats_cache"""
+    # Verify app exists
+    app = await get_app(app_id)
+    if not app:
+        return None
     
-    # Get permissions summary
-    permissions = await UserAppPermission.filter(
-        user_id=user_id,
-        app_id=app_id
-    ).select_related('category').all()
+    # Get contributions and permissions summary concurrently
+    total_contributions, permissions = await asyncio.gather(
+        PreferenceSource.filter(app_id=app_id, user_id=user_id).count(),
+        UserAppPermission.filter(
+            user_id=user_id,
+            app_id=app_id
+        ).values("category__slug", "can_read", "can_write")
+    )
     
     permissions_summary = {}
     for perm in permissions:
-        category_key = perm.category.slug if perm.category else "all"
+        category_key = perm["category__slug"] or "all"
         permissions_summary[category_key] = {
-            "can_read": perm.can_read,
-            "can_write": perm.can_write
+            "can_read": perm["can_read"],
+            "can_write": perm["can_write"]
         }
     
     return {
         "app_name": app.name,
         "app_id": str(app.id),
         "is_active": app.is_active,
-        "statistics": {
-            "total_queries": total_queries,
-            "total_contributions": total_contributions,
-            "recent_queries_30d": recent_queries,
-            "current_noise_level": round(current_noise, 4),
-            "permissions_summary": permissions_summary
-        },
+        "total_contributions": total_contributions,
+        "permissions_summary": permissions_summary,
         "integration_date": app.created_at
     }
\ No newline at end of file
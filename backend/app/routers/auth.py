@@ -4,6 +4,7 @@ from app.schema.auth import UserSignup, UserSignin, TokenResponse, UserResponse
 from app.models.user import User
 from app.utils.auth import get_password_hash, authenticate_user, create_access_token, get_current_user
 from datetime import datetime
+import asyncio
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -12,8 +13,8 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 async def signup(user_data: UserSignup):
     """Register a new user."""
     try:
-        # Hash the password
-        password_hash = get_password_hash(user_data.password)
+        # Hash the password in a worker thread so bcrypt doesn't block the event loop
+        password_hash = await asyncio.to_thread(get_password_hash, user_data.password)
         
         # Create the user
         user = await User.create(
@@ -1,17 +1,37 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Request
+from tortoise.functions import Count
 from app.models.preference_category import PreferenceCategory
 from app.models.user_preference import UserPreference
+from app.utils.cache_invalidation import invalidate_categories
+from app.utils.response_cache import categories_cache, should_bypass_cache, serialize_json, json_response
 from typing import Optional
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
 
 @router.get("/")
-async def get_all_categories(user_id: Optional[str] = Query(None, description="User ID to get preference counts for")):
+async def get_all_categories(
+    request: Request,
+    user_id: Optional[str] = Query(None, description="User ID to get preference counts for")
+):
     """Get all available preference categories with optional preference counts for a user"""
     
+    cache_key = (user_id,)
+    if not should_bypass_cache(request):
+        cached = categories_cache.get(cache_key)
+        if cached is not None:
+            return json_response(cached)
+    
     categories = await PreferenceCategory.all().order_by('name')
     
+    # If user_id provided, get preference counts for all categories in one query
+    pref_counts = {}
+    if user_id:
+        rows = await UserPreference.filter(
+            user_id=user_id
+        ).annotate(c=Count("id")).group_by("category_id").values("category_id", "c")
+        pref_counts = {row["category_id"]: row["c"] for row in rows}
+    
     # Build response with preference counts if user_id provided
     categories_response = []
     for cat in categories:
@@ -20,19 +40,17 @@ async def get_all_categories(user_id: Optional[str] = Query(None, description="U
             "name": cat.name,
             "slug": cat.slug,
             "description": cat.description,
-            "preference_count": 0  # default
+            "preference_count": pref_counts.get(cat.id, 0)
         }
         
-        # If user_id provided, get actual preference count
-        if user_id:
-            pref_count = await UserPreference.filter(category_id=cat.id, user_id=user_id).count()
-            category_data["preference_count"] = pref_count
-        
         categories_response.append(category_data)
     
-    return {
+    response = {
         "categories": categories_response
     }
+    body = serialize_json(response)
+    categories_cache.set(cache_key, body)
+    return json_response(body)
 
 
 @router.post("/seed")
@@ -92,23 +110,37 @@ async def seed_categories():
         }
     ]
     
-    created_categories = []
-    
-    for cat_data in categories_data:
-        category, created = await PreferenceCategory.get_or_create(
+    # Insert all missing categories in one statement instead of a get_or_create per row
+    existing_slugs = set(await PreferenceCategory.all().values_list("slug", flat=True))
+    new_categories = [
+        PreferenceCategory(
+            name=cat_data["name"],
             slug=cat_data["slug"],
-            defaults={
-                "name": cat_data["name"],
-                "description": cat_data["description"]
-            }
+            description=cat_data["description"]
         )
-        
-        if created:
-            created_categories.append(cat_data["name"])
+        for cat_data in categories_data
+        if cat_data["slug"] not in existing_slugs
+    ]
+    
+    if new_categories:
+        await PreferenceCategory.bulk_create(new_categories, ignore_conflicts=True)
+    
+    created_categories = [category.name for category in new_categories]
+    
+    if created_categories:
+        await invalidate_categories()
     
     return {
         "success": True,
         "message": f"Categories seeded successfully",
         "created_categories": created_categories,
         "total_categories": len(categories_data)
-    }
\ No newline at end of file
+    }
+
+
+@router.post("/reload")
+async def reload_categories():
+    """Reload the in-process category caches from the database, in every worker"""
+    await invalidate_categories()
+    
+    return {"success": True}
@@ -1,20 +1,31 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, Form
 from fastapi.responses import RedirectResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import Optional
+from typing import AbstractSet, Optional
 import secrets
-import jwt
 import hashlib
+import hmac
 import base64
 import os
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timedelta
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from urllib.parse import quote, urlencode
+from tortoise import Tortoise
+from tortoise.transactions import in_transaction
 
-from app.models import OAuthClient, OAuthAuthorizationCode, OAuthAccessToken, OAuthRefreshToken, User
+from app.models import OAuthAuthorizationCode, OAuthAccessToken, OAuthRefreshToken, User
+from app.models.oauth_access_token import hash_token, token_prefix
 from app.schema.oauth import (
     OAuthValidateRequest, OAuthConsentRequest, OAuthTokenRequest, OAuthTokenResponse, 
     VaultConsentInfo, VaultScopeInfo
 )
 from app.utils.auth import get_current_user
+from app.utils.clock import request_now
+from app.utils.jwt_signer import encode_hs256_async
+from app.utils.token_pool import token_urlsafe_pooled
+from app.utils.oauth_cache import get_client
 
 # Use same secret key as main auth system
 SECRET_KEY = os.getenv("SECRET_KEY", "your-super-secret-key-change-this-in-production")
@@ -23,26 +34,62 @@ router = APIRouter(prefix="/oauth", tags=["OAuth"])
 
 # Use existing auth middleware - no need to reimplement
 
+@dataclass(frozen=True, slots=True)
+class ScopeDefinition:
+    """A scope third-party apps can request"""
+    description: str
+    access_type: str
+    category: Optional[str] = None
+
 # Vault scope definitions
-VAULT_SCOPES = {
-    "read:preferences": {"description": "Read all preference categories", "access_type": "read"},
-    "write:preferences": {"description": "Add preferences to all categories", "access_type": "write"},
-    "query:preferences": {"description": "Query preference similarity scores", "access_type": "query"},
-    "read:preferences:food": {"description": "Read food preferences", "access_type": "read", "category": "food"},
-    "read:preferences:entertainment": {"description": "Read entertainment preferences", "access_type": "read", "category": "entertainment"},
-    "read:preferences:gaming": {"description": "Read gaming preferences", "access_type": "read", "category": "gaming"},
-    "read:preferences:ui-ux": {"description": "Read UI/UX preferences", "access_type": "read", "category": "ui-ux"},
-    "write:preferences:food": {"description": "Add food preferences", "access_type": "write", "category": "food"},
-    "write:preferences:entertainment": {"description": "Add entertainment preferences", "access_type": "write", "category": "entertainment"},
-}
+VAULT_SCOPES = MappingProxyType({
+    "read:preferences": ScopeDefinition("Read all preference categories", "read"),
+    "write:preferences": ScopeDefinition("Add preferences to all categories", "write"),
+    "query:preferences": ScopeDefinition("Query preference similarity scores", "query"),
+    "read:preferences:food": ScopeDefinition("Read food preferences", "read", "food"),
+    "read:preferences:entertainment": ScopeDefinition("Read entertainment preferences", "read", "entertainment"),
+    "read:preferences:gaming": ScopeDefinition("Read gaming preferences", "read", "gaming"),
+    "read:preferences:ui-ux": ScopeDefinition("Read UI/UX preferences", "read", "ui-ux"),
+    "write:preferences:food": ScopeDefinition("Add food preferences", "write", "food"),
+    "write:preferences:entertainment": ScopeDefinition("Add entertainment preferences", "write", "entertainment"),
+})
 
 def parse_scopes(scope_string: str) -> list[str]:
     """Parse space-separated scopes"""
-    return scope_string.strip().split() if scope_string else []
+    # str.split() with no separator already drops leading/trailing whitespace
+    return scope_string.split() if scope_string else []
+
+VAULT_SCOPE_KEYS = frozenset(VAULT_SCOPES)
 
-def validate_scopes(requested_scopes: list[str], allowed_scopes: list[str]) -> list[str]:
+def validate_scopes(requested_scopes: list[str], allowed_scopes: AbstractSet[str]) -> list[str]:
     """Validate requested scopes against allowed scopes"""
-    return [scope for scope in requested_scopes if scope in allowed_scopes and scope in VAULT_SCOPES]
+    # Intersect the two sets once so each requested scope is a single hashed lookup
+    grantable = VAULT_SCOPE_KEYS & allowed_scopes
+    return [scope for scope in requested_scopes if scope in grantable]
+
+def build_redirect_url(base_url: str, **params: Optional[str]) -> str:
+    """Append URL-encoded query parameters to a URL, skipping None values"""
+    query = urlencode({key: value for key, value in params.items() if value is not None}, quote_via=quote)
+    separator = "&" if "?" in base_url else "?"
+    return f"{base_url}{separator}{query}"
+
+# Authorization error responses, with their query strings encoded once at import
+AUTHORIZE_ERRORS = {
+    "unsupported_response_type": "Only authorization code flow supported",
+    "invalid_client": "Invalid client ID",
+    "invalid_scope": "No valid scopes requested",
+    "access_denied": "User denied authorization",
+}
+_AUTHORIZE_ERROR_QUERIES = {
+    error: urlencode({"error": error, "error_description": description}, quote_via=quote)
+    for error, description in AUTHORIZE_ERRORS.items()
+}
+
+def build_error_redirect_url(redirect_uri: str, error: str, state: Optional[str]) -> str:
+    """Build the redirect URL for an authorization error (see AUTHORIZE_ERRORS)"""
+    separator = "&" if "?" in redirect_uri else "?"
+    state_part = f"&state={quote(state, safe='')}" if state is not None else ""
+    return f"{redirect_uri}{separator}{_AUTHORIZE_ERROR_QUERIES[error]}{state_part}"
 
 @router.get("/authorize")
 async def oauth_authorize(
@@ -59,17 +106,13 @@ async def oauth_authorize(
     
     # Only support authorization code flow
     if response_type != "code":
-        error_url = f"{redirect_uri}?error=unsupported_response_type&error_description=Only+authorization+code+flow+supported"
-        if state:
-            error_url += f"&state={state}"
+        error_url = build_error_redirect_url(redirect_uri, "unsupported_response_type", state)
         return RedirectResponse(url=error_url)
     
     # Validate client
-    client = await OAuthClient.get_or_none(client_id=client_id)
+    client = await get_client(client_id)
     if not client:
-        error_url = f"{redirect_uri}?error=invalid_client&error_description=Invalid+client+ID"
-        if state:
-            error_url += f"&state={state}"
+        error_url = build_error_redirect_url(redirect_uri, "invalid_client", state)
         return RedirectResponse(url=error_url)
     
     # Validate redirect URI
@@ -81,22 +124,20 @@ async def oauth_authorize(
     valid_scopes = validate_scopes(requested_scopes, client.allowed_scopes)
     
     if not valid_scopes:
-        error_url = f"{redirect_uri}?error=invalid_scope&error_description=No+valid+scopes+requested"
-        if state:
-            error_url += f"&state={state}"
+        error_url = build_error_redirect_url(redirect_uri, "invalid_scope", state)
         return RedirectResponse(url=error_url)
     
-    # Build OAuth parameters for frontend redirect
-    oauth_params = f"response_type={response_type}&client_id={client_id}&redirect_uri={redirect_uri}&scope={scope}"
-    if state:
-        oauth_params += f"&state={state}"
-    if code_challenge:
-        oauth_params += f"&code_challenge={code_challenge}"
-    if code_challenge_method:
-        oauth_params += f"&code_challenge_method={code_challenge_method}"
-    
-    # Always redirect to frontend - let frontend handle authentication check
-    frontend_url = f"http://localhost:3000/oauth/authorize?{oauth_params}"
+    # Always redirect to frontend with the OAuth parameters - let frontend handle authentication check
+    frontend_url = build_redirect_url(
+        "http://localhost:3000/oauth/authorize",
+        response_type=response_type,
+        client_id=client_id,
+        redirect_uri=redirect_uri,
+        scope=scope,
+        state=state,
+        code_challenge=code_challenge,
+        code_challenge_method=code_challenge_method
+    )
     return RedirectResponse(url=frontend_url)
 
 @router.post("/validate-request")
@@ -107,7 +148,7 @@ async def oauth_validate_request(
     """Validate OAuth request parameters (API endpoint for frontend)"""
     
     # Validate client
-    client = await OAuthClient.get_or_none(client_id=request.client_id)
+    client = await get_client(request.client_id)
     if not client:
         raise HTTPException(status_code=400, detail="Invalid client")
     
@@ -126,24 +167,24 @@ async def oauth_validate_request(
     scope_info = []
     affected_categories = set()
     
+    # validate_scopes only returns scopes defined in VAULT_SCOPES
     for scope in valid_scopes:
-        if scope in VAULT_SCOPES:
-            scope_data = VAULT_SCOPES[scope]
-            scope_info.append(VaultScopeInfo(
-                scope=scope,
-                category=scope_data.get("category"),
-                access_type=scope_data["access_type"],
-                description=scope_data["description"]
-            ))
-            if scope_data.get("category"):
-                affected_categories.add(scope_data["category"])
+        scope_data = VAULT_SCOPES[scope]
+        scope_info.append(VaultScopeInfo(
+            scope=scope,
+            category=scope_data.category,
+            access_type=scope_data.access_type,
+            description=scope_data.description
+        ))
+        if scope_data.category:
+            affected_categories.add(scope_data.category)
     
     # Get user's preference count (mock for now)
     user_preferences_count = 42  # TODO: Get actual count from database
     
     return VaultConsentInfo(
         client_name=client.name,
-        client_description=getattr(client, 'description', None),
+        client_description=client.description,
         requested_scopes=scope_info,
         user_preferences_count=user_preferences_count,
         affected_categories=list(affected_categories)
@@ -152,19 +193,18 @@ async def oauth_validate_request(
 @router.post("/consent")
 async def oauth_consent_submit(
     request: OAuthConsentRequest,
-    user: User = Depends(get_current_user)
+    user: User = Depends(get_current_user),
+    now: datetime = Depends(request_now)
 ):
     """Handle OAuth consent form submission (API endpoint for frontend)"""
     
     if not request.approved:
         # User denied - return redirect URL with error
-        error_url = f"{request.redirect_uri}?error=access_denied&error_description=User+denied+authorization"
-        if request.state:
-            error_url += f"&state={request.state}"
+        error_url = build_error_redirect_url(request.redirect_uri, "access_denied", request.state)
         return {"redirect_url": error_url}
     
     # Validate client
-    client = await OAuthClient.get_or_none(client_id=request.client_id)
+    client = await get_client(request.client_id)
     if not client:
         raise HTTPException(status_code=400, detail="Invalid client")
     
@@ -173,25 +213,24 @@ async def oauth_consent_submit(
     valid_granted_scopes = validate_scopes(granted_scopes, client.allowed_scopes)
     
     # Generate authorization code
-    auth_code = secrets.token_urlsafe(32)
-    expires_at = datetime.now(timezone.utc) + timedelta(minutes=10)  # 10 minute expiry
+    auth_code = token_urlsafe_pooled(32)
+    expires_at = now + timedelta(minutes=10)  # 10 minute expiry
     
     # Store authorization code
     await OAuthAuthorizationCode.create(
         code=auth_code,
-        client=client,
+        client_id=client.id,
         user=user,
         redirect_uri=request.redirect_uri,
         scopes=valid_granted_scopes,
-        code_challenge=request.code_challenge,
+        # Store the challenge unpadded so verification is a single comparison
+        code_challenge=request.code_challenge.rstrip("=") if request.code_challenge else None,
         code_challenge_method=request.code_challenge_method,
         expires_at=expires_at
     )
     
     # Build redirect URL
-    redirect_url = f"{request.redirect_uri}?code={auth_code}"
-    if request.state:
-        redirect_url += f"&state={request.state}"
+    redirect_url = build_redirect_url(request.redirect_uri, code=auth_code, state=request.state)
     
     return {"redirect_url": redirect_url}
 
@@ -203,7 +242,8 @@ async def oauth_token(
     code: Optional[str] = Form(None),
     redirect_uri: Optional[str] = Form(None),
     refresh_token: Optional[str] = Form(None),
-    code_verifier: Optional[str] = Form(None)
+    code_verifier: Optional[str] = Form(None),
+    now: datetime = Depends(request_now)
 ):
     """OAuth 2.0 token endpoint - accepts form-encoded data per OAuth 2.0 spec"""
     
@@ -222,157 +262,198 @@ async def oauth_token(
     
     if request.grant_type == "authorization_code":
         print(f"DEBUG: Handling authorization code grant - code: {request.code}, redirect_uri: {request.redirect_uri}")
-        return await handle_authorization_code_grant(request)
+        return await handle_authorization_code_grant(request, now)
     elif request.grant_type == "refresh_token":
-        return await handle_refresh_token_grant(request)
+        return await handle_refresh_token_grant(request, now)
     else:
         raise HTTPException(status_code=400, detail="Unsupported grant type")
 
-async def handle_authorization_code_grant(request: OAuthTokenRequest):
+# Redeem an authorization code in one round-trip; deleting it atomically means a
+# code can never be exchanged twice, even by concurrent requests (the row lock makes a
+# concurrent redemption wait for this transaction, then find nothing)
+CONSUME_AUTHORIZATION_CODE_SQL = """
+    DELETE FROM oauth_authorization_codes
+    WHERE code = $1
+    RETURNING client_id, user_id, redirect_uri, scopes, code_challenge, code_challenge_method, expires_at
+"""
+
+async def handle_authorization_code_grant(request: OAuthTokenRequest, now: datetime):
     """Handle authorization code grant"""
     
     if not request.code or not request.redirect_uri:
         raise HTTPException(status_code=400, detail="Missing code or redirect_uri")
     
-    # Get authorization code
-    auth_code = await OAuthAuthorizationCode.get_or_none(
-        code=request.code
-    ).prefetch_related("client", "user")
-    
-    print(f"DEBUG: Auth code lookup result: {auth_code}")
-    if auth_code:
-        print(f"DEBUG: Auth code details - client_id: {auth_code.client.client_id}, redirect_uri: {auth_code.redirect_uri}")
-    
-    if not auth_code:
-        print(f"DEBUG: No authorization code found for: {request.code}")
-        raise HTTPException(status_code=400, detail="Invalid authorization code")
-    
-    # Check expiry
-    if datetime.now(timezone.utc) > auth_code.expires_at:
-        await auth_code.delete()
-        raise HTTPException(status_code=400, detail="Authorization code expired")
-    
-    # Validate client
-    if auth_code.client.client_id != request.client_id:
-        raise HTTPException(status_code=400, detail="Client mismatch")
-    
-    # Validate redirect URI
-    if auth_code.redirect_uri != request.redirect_uri:
-        raise HTTPException(status_code=400, detail="Redirect URI mismatch")
-    
-    # Validate client secret (for confidential clients)
-    if not auth_code.client.is_public:
-        if not request.client_secret or request.client_secret != auth_code.client.client_secret:
-            raise HTTPException(status_code=400, detail="Invalid client secret")
-    
-    # Validate PKCE (for public clients)
-    if auth_code.client.is_public and auth_code.code_challenge:
-        if not request.code_verifier:
-            raise HTTPException(status_code=400, detail="Missing code verifier")
+    # Redeeming the code and issuing tokens is one transaction: any validation error or
+    # failed insert below rolls the consumption back, so the code isn't burned
+    async with in_transaction() as conn:
+        # Consume authorization code
+        rows = await conn.execute_query_dict(CONSUME_AUTHORIZATION_CODE_SQL, [request.code])
         
-        if auth_code.code_challenge_method == "S256":
-            expected_challenge = base64.urlsafe_b64encode(
-                hashlib.sha256(request.code_verifier.encode()).digest()
-            ).decode().rstrip("=")
-        else:
-            expected_challenge = request.code_verifier
+        if not rows:
+            print(f"DEBUG: No authorization code found for: {request.code}")
+            raise HTTPException(status_code=400, detail="Invalid authorization code")
         
-        if auth_code.code_challenge != expected_challenge:
-            raise HTTPException(status_code=400, detail="Invalid code verifier")
-    
-    # Clean up any existing tokens first to prevent duplicates
-    existing_tokens = await OAuthAccessToken.filter(
-        client=auth_code.client, 
-        user=auth_code.user
-    ).all()
-    
-    for token in existing_tokens:
-        print(f"DEBUG: Deleting existing token: {token.token[:50]}...")
-        # Delete associated refresh tokens first
-        refresh_tokens = await OAuthRefreshToken.filter(access_token=token).all()
-        for refresh_token in refresh_tokens:
-            await refresh_token.delete()
-        await token.delete()
-    
-    # Generate tokens with credentials hash AFTER cleanup
-    access_token_jwt, credentials_hash = await generate_access_token_with_hash(
-        str(auth_code.user.id), auth_code.client.client_id, auth_code.scopes
-    )
-    refresh_token_str = secrets.token_urlsafe(32)
-    
-    # Store tokens in database
-    access_token = await OAuthAccessToken.create(
-        token=access_token_jwt,
-        client=auth_code.client,
-        user=auth_code.user,
-        scopes=auth_code.scopes,
-        expires_at=datetime.now(timezone.utc) + timedelta(hours=1)
-    )
-    
-    await OAuthRefreshToken.create(
-        token=refresh_token_str,
-        client=auth_code.client,
-        user=auth_code.user,
-        access_token=access_token,
-        scopes=auth_code.scopes,
-        expires_at=datetime.now(timezone.utc) + timedelta(days=30)
-    )
-    
-    # Clean up authorization code
-    await auth_code.delete()
+        auth_code = rows[0]
+        print(f"DEBUG: Auth code details - client: {auth_code['client_id']}, redirect_uri: {auth_code['redirect_uri']}")
+        
+        # Check expiry
+        if now > auth_code["expires_at"]:
+            raise HTTPException(status_code=400, detail="Authorization code expired")
+        
+        # Validate client
+        client = await get_client(request.client_id)
+        if not client or client.id != auth_code["client_id"]:
+            raise HTTPException(status_code=400, detail="Client mismatch")
+        
+        # Validate redirect URI
+        if auth_code["redirect_uri"] != request.redirect_uri:
+            raise HTTPException(status_code=400, detail="Redirect URI mismatch")
+        
+        # Validate client secret (for confidential clients)
+        if not client.is_public:
+            if not request.client_secret or not hmac.compare_digest(
+                request.client_secret.encode(), client.client_secret.encode()
+            ):
+                raise HTTPException(status_code=400, detail="Invalid client secret")
+        
+        # Validate PKCE (for public clients)
+        if client.is_public and auth_code["code_challenge"]:
+            if not request.code_verifier:
+                raise HTTPException(status_code=400, detail="Missing code verifier")
+            
+            if auth_code["code_challenge_method"] == "S256":
+                # A SHA-256 digest always encodes to 43 chars plus a single "=" pad
+                expected_challenge = base64.urlsafe_b64encode(
+                    hashlib.sha256(request.code_verifier.encode()).digest()
+                )[:-1]
+            else:
+                expected_challenge = request.code_verifier.encode()
+            
+            # Constant-time comparisons so secrets can't be recovered through response timing
+            if not hmac.compare_digest(auth_code["code_challenge"].encode(), expected_challenge):
+                raise HTTPException(status_code=400, detail="Invalid code verifier")
+        
+        user_id = auth_code["user_id"]
+        scopes = list(auth_code["scopes"])
+        
+        # Generate tokens with credentials hash
+        access_token_jwt, credentials_hash = await generate_access_token_with_hash(
+            str(user_id), client.client_id, scopes, now
+        )
+        refresh_token_str = token_urlsafe_pooled(32)
+        
+        # Clean up any existing tokens first to prevent duplicates
+        existing_tokens = await OAuthAccessToken.filter(
+            client_id=client.id, 
+            user_id=user_id
+        ).using_db(conn).values_list("id", flat=True)
+        
+        if existing_tokens:
+            existing_ids = list(existing_tokens)
+            # Delete associated refresh tokens first
+            await OAuthRefreshToken.filter(access_token_id__in=existing_ids).using_db(conn).delete()
+            await OAuthAccessToken.filter(id__in=existing_ids).using_db(conn).delete()
+        
+        # Store tokens in database
+        access_token = await OAuthAccessToken.create(
+            token=access_token_jwt,
+            client_id=client.id,
+            user_id=user_id,
+            scopes=scopes,
+            expires_at=now + timedelta(hours=1),
+            using_db=conn
+        )
+        await OAuthRefreshToken.create(
+            token=refresh_token_str,
+            client_id=client.id,
+            user_id=user_id,
+            access_token=access_token,
+            scopes=scopes,
+            expires_at=now + timedelta(days=30),
+            using_db=conn
+        )
     
     return OAuthTokenResponse(
         access_token=access_token_jwt,
         token_type="Bearer",
         expires_in=3600,  # 1 hour
         refresh_token=refresh_token_str,
-        scope=" ".join(auth_code.scopes),
+        scope=scope_string(scopes),
         credentials_hash=credentials_hash  # Include for matrix generation
     )
 
-async def handle_refresh_token_grant(request: OAuthTokenRequest):
+# Rotate the access token behind a live refresh token in one statement
+ROTATE_ACCESS_TOKEN_SQL = """
+    UPDATE oauth_access_tokens AS t
+    SET token = $1, token_hash = $2, token_prefix = $3, expires_at = $4
+    FROM oauth_refresh_tokens AS r
+    WHERE r.id = $5
+      AND r.revoked = false
+      AND t.id = r.access_token_id
+    RETURNING t.id
+"""
+
+async def handle_refresh_token_grant(request: OAuthTokenRequest, now: datetime):
     """Handle refresh token grant"""
     
     if not request.refresh_token:
         raise HTTPException(status_code=400, detail="Missing refresh token")
     
     # Get refresh token
-    refresh_token = await OAuthRefreshToken.get_or_none(
+    rows = await OAuthRefreshToken.filter(
         token=request.refresh_token,
         revoked=False
-    ).prefetch_related("client", "access_token", "user")
+    ).values("id", "client_id", "user_id", "scopes", "expires_at")
     
-    if not refresh_token:
+    if not rows:
         raise HTTPException(status_code=400, detail="Invalid refresh token")
     
+    refresh_token = rows[0]
+    
     # Check expiry
-    if datetime.now(timezone.utc) > refresh_token.expires_at:
-        await refresh_token.update(revoked=True)
+    if now > refresh_token["expires_at"]:
+        await OAuthRefreshToken.filter(id=refresh_token["id"]).update(revoked=True)
         raise HTTPException(status_code=400, detail="Refresh token expired")
     
     # Validate client
-    if refresh_token.client.client_id != request.client_id:
+    client = await get_client(request.client_id)
+    if not client or client.id != refresh_token["client_id"]:
         raise HTTPException(status_code=400, detail="Client mismatch")
     
+    scopes = list(refresh_token["scopes"])
+    
     # Generate new access token
-    new_access_token_jwt = generate_access_token(
-        str(refresh_token.user.id), refresh_token.client.client_id, refresh_token.scopes
+    new_access_token_jwt = await generate_access_token(
+        str(refresh_token["user_id"]), client.client_id, scopes, now
     )
     
-    # Update access token in database
-    access_token = refresh_token.access_token
-    access_token.token = new_access_token_jwt
-    access_token.expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
-    await access_token.save()
+    # Swap the new JWT into the access token, unless the refresh token was revoked meanwhile
+    new_token_hash = hash_token(new_access_token_jwt)
+    expires_at = now + timedelta(hours=1)
+    rotated = await Tortoise.get_connection("default").execute_query_dict(
+        ROTATE_ACCESS_TOKEN_SQL,
+        [new_access_token_jwt, new_token_hash, token_prefix(new_access_token_jwt), expires_at, refresh_token["id"]]
+    )
+    
+    if not rotated:
+        raise HTTPException(status_code=400, detail="Invalid refresh token")
     
     return OAuthTokenResponse(
         access_token=new_access_token_jwt,
         token_type="Bearer", 
         expires_in=3600,
-        scope=" ".join(refresh_token.scopes)
+        scope=scope_string(scopes)
     )
 
-async def generate_access_token_with_hash(user_id: str, client_id: str, scopes: list[str]) -> tuple[str, str]:
+@lru_cache(maxsize=256)
+def _join_scopes(scopes: tuple[str, ...]) -> str:
+    return " ".join(scopes)
+
+def scope_string(scopes: list[str]) -> str:
+    """Space-delimited scope string (clients request a handful of distinct scope sets)"""
+    return _join_scopes(tuple(scopes))
+
+async def generate_access_token_with_hash(user_id: str, client_id: str, scopes: list[str], now: datetime) -> tuple[str, str]:
     """Generate JWT access token with user credentials hash for privacy matrix"""
     
     # Get user for credentials hash
@@ -383,31 +464,32 @@ async def generate_access_token_with_hash(user_id: str, client_id: str, scopes:
     credentials_hash = hashlib.sha256(credentials_for_hash.encode()).hexdigest()
     
     # Add unique timestamp to prevent duplicate tokens
-    current_time = datetime.now(timezone.utc)
+    issued_at = int(now.timestamp())
     unique_id = secrets.token_hex(8)  # 16 character random hex
     
     payload = {
         "sub": user_id,
         "aud": client_id,
-        "scope": " ".join(scopes),
-        "iat": current_time.timestamp(),
-        "exp": (current_time + timedelta(hours=1)).timestamp(),
+        "scope": scope_string(scopes),
+        "iat": issued_at,
+        "exp": issued_at + 3600,
         "credentials_hash": credentials_hash,
         "jti": unique_id  # Unique token identifier
     }
     
-    token = jwt.encode(payload, SECRET_KEY, algorithm="HS256")
+    token = await encode_hs256_async(payload, SECRET_KEY)
     return token, credentials_hash
 
-def generate_access_token(user_id: str, client_id: str, scopes: list[str]) -> str:
+async def generate_access_token(user_id: str, client_id: str, scopes: list[str], now: datetime) -> str:
     """Generate JWT access token (backward compatibility)"""
     
+    issued_at = int(now.timestamp())
     payload = {
         "sub": user_id,
         "aud": client_id,
-        "scope": " ".join(scopes),
-        "iat": datetime.now(timezone.utc),
-        "exp": datetime.now(timezone.utc) + timedelta(hours=1)
+        "scope": scope_string(scopes),
+        "iat": issued_at,
+        "exp": issued_at + 3600
     }
     
-    return jwt.encode(payload, SECRET_KEY, algorithm="HS256")
\ No newline at end of file
+    return await encode_hs256_async(payload, SECRET_KEY)
\ No newline at end of file
@@ -1,4 +1,9 @@
+import asyncio
+import numpy as np
+import orjson
+from uuid import uuid4
 from fastapi import APIRouter, Query, HTTPException
+from tortoise import Tortoise
 from app.schema.permissions import (
     UserPermissionsResponse,
     UpdatePermissionRequest,
@@ -6,11 +11,50 @@ from app.schema.permissions import (
     PermissionMatrixResponse
 )
 from app.models.user_app_permission import UserAppPermission
-from app.models.app import App
 from app.models.preference_category import PreferenceCategory
+from app.utils.app_cache import get_app
+from app.utils.category_cache import get_category_by_id
+from app.utils.response_cache import json_response
+from app.utils.cache_invalidation import invalidate_user_caches
 
 router = APIRouter(prefix="/permissions", tags=["permissions"])
 
+# Bits of a permission matrix cell
+PERMISSION_READ = 1
+PERMISSION_WRITE = 2
+
+
+def _upsert_permission_sql(all_categories: bool, update_write: bool) -> str:
+    # NULL category_ids never conflict under the (user_id, app_id, category_id) constraint,
+    # so "all categories" rows conflict on the partial unique index from migration 11
+    conflict_target = "(user_id, app_id) WHERE category_id IS NULL" if all_categories else "(user_id, app_id, category_id)"
+    assignments = "can_read = EXCLUDED.can_read, updated_at = EXCLUDED.updated_at"
+    if update_write:
+        assignments += ", can_write = EXCLUDED.can_write"
+    return f"""
+        INSERT INTO user_app_permissions (id, user_id, app_id, category_id, can_read, can_write, created_at, updated_at)
+        VALUES ($1, $2, $3, $4, $5, $6, now(), now())
+        ON CONFLICT {conflict_target} DO UPDATE SET {assignments}
+        RETURNING (xmax = 0) AS created
+    """
+
+UPSERT_PERMISSION_SQL = {
+    (all_categories, update_write): _upsert_permission_sql(all_categories, update_write)
+    for all_categories in (False, True)
+    for update_write in (False, True)
+}
+
+
+async def upsert_permission(
+    user_id, app_id, category_id, can_read: bool, can_write: bool, update_write: bool = True
+) -> bool:
+    """Create or update a permission in one statement; returns True if it was created"""
+    sql = UPSERT_PERMISSION_SQL[(category_id is None, update_write)]
+    rows = await Tortoise.get_connection("default").execute_query_dict(
+        sql, [uuid4(), user_id, app_id, category_id, can_read, can_write]
+    )
+    return rows[0]["created"]
+
 
 @router.get("/user", response_model=UserPermissionsResponse)
 async def get_user_permissions(
@@ -18,35 +62,35 @@ async def get_user_permissions(
 ):
     """Get all app permissions for a user organized by app and category"""
     
-    # Get all permissions for this user
+    # Get all permissions on active apps for this user
     permissions = await UserAppPermission.filter(
-        user_id=user_id
-    ).select_related('app', 'category').order_by('app__name').all()
+        user_id=user_id,
+        app__is_active=True
+    ).order_by('app__name').values(
+        "app_id", "app__name", "category_id", "category__name", "can_read", "can_write"
+    )
     
     # Group by app
     apps_permissions = {}
     
     for perm in permissions:
-        app = perm.app
-        if not app.is_active:
-            continue
-            
-        if app.id not in apps_permissions:
-            apps_permissions[app.id] = {
-                "app_id": str(app.id),
-                "app_name": app.name,
+        app_id = perm["app_id"]
+        if app_id not in apps_permissions:
+            apps_permissions[app_id] = {
+                "app_id": str(app_id),
+                "app_name": perm["app__name"],
                 "permissions": []
             }
         
         # Add category permission
         category_info = {
-            "category_id": str(perm.category.id) if perm.category else "all",
-            "category_name": perm.category.name if perm.category else "All Categories",
-            "can_read": perm.can_read,
-            "can_write": perm.can_write
+            "category_id": str(perm["category_id"]) if perm["category_id"] else "all",
+            "category_name": perm["category__name"] if perm["category_id"] else "All Categories",
+            "can_read": perm["can_read"],
+            "can_write": perm["can_write"]
         }
         
-        apps_permissions[app.id]["permissions"].append(category_info)
+        apps_permissions[app_id]["permissions"].append(category_info)
     
     return UserPermissionsResponse(
         apps=list(apps_permissions.values())
@@ -61,33 +105,24 @@ async def update_permission(
     """Update permissions for a specific app and category combination"""
     
     # Verify app exists
-    app = await App.get_or_none(id=request.app_id)
+    app = await get_app(request.app_id)
     if not app:
         raise HTTPException(status_code=404, detail="App not found")
     
     # Handle category
     category_id = None
     if request.category_id != "all":
-        category = await PreferenceCategory.get_or_none(id=request.category_id)
+        category = await get_category_by_id(request.category_id)
         if not category:
             raise HTTPException(status_code=404, detail="Category not found")
         category_id = category.id
     
     # Update or create permission
-    permission, created = await UserAppPermission.get_or_create(
-        user_id=user_id,
-        app_id=request.app_id,
-        category_id=category_id,
-        defaults={
-            "can_read": request.can_read,
-            "can_write": request.can_write
-        }
+    created = await upsert_permission(
+        user_id, app.id, category_id, can_read=request.can_read, can_write=request.can_write
     )
     
-    if not created:
-        permission.can_read = request.can_read
-        permission.can_write = request.can_write
-        await permission.save()
+    await invalidate_user_caches(user_id)
     
     action = "created" if created else "updated"
     category_name = "all categories" if category_id is None else f"category {request.category_id}"
@@ -104,49 +139,43 @@ async def get_permission_matrix(
 ):
     """Get permission matrix for dashboard display - shows all apps vs all categories"""
     
-    # Get all active apps that have permissions for this user
-    apps_with_permissions = await App.filter(
-        permissions__user_id=user_id,
-        is_active=True
-    ).distinct().all()
-    
-    # Get all categories
-    categories = await PreferenceCategory.all().order_by('name')
-    
-    # Get all permissions for this user
-    permissions = await UserAppPermission.filter(
-        user_id=user_id
-    ).select_related('app', 'category').all()
+    # Get all categories and all permissions on active apps for this user
+    # (the app list is derived from the permissions)
+    categories, permissions = await asyncio.gather(
+        PreferenceCategory.all().order_by('name').values_list("id", "name"),
+        UserAppPermission.filter(
+            user_id=user_id,
+            app__is_active=True
+        ).values("app_id", "app__name", "category_id", "can_read", "can_write")
+    )
     
-    # Build permission matrix
-    permission_dict = {}
+    # Column 0 is "All Categories" (category_id is None), then categories by name
+    category_index = {None: 0}
+    category_names = ["All Categories"]
+    for category_id, name in categories:
+        category_index[category_id] = len(category_names)
+        category_names.append(name)
     
+    # Row per app, in order of first appearance
+    app_index = {}
+    app_names = []
     for perm in permissions:
-        if not perm.app.is_active:
-            continue
-            
-        app_id = str(perm.app.id)
-        category_key = str(perm.category.id) if perm.category else "all"
-        
-        if app_id not in permission_dict:
-            permission_dict[app_id] = {}
-        
-        permission_dict[app_id][category_key] = {
-            "can_read": perm.can_read,
-            "can_write": perm.can_write
-        }
+        if perm["app_id"] not in app_index:
+            app_index[perm["app_id"]] = len(app_names)
+            app_names.append(perm["app__name"])
     
-    # Build app names list
-    app_names = [app.name for app in apps_with_permissions]
-    
-    # Build category names list (include "All Categories" option)
-    category_names = ["All Categories"] + [cat.name for cat in categories]
+    # Build permission matrix as a bitmap (see PERMISSION_READ / PERMISSION_WRITE)
+    cells = np.zeros((len(app_names), len(category_names)), dtype=np.uint8)
+    for perm in permissions:
+        cells[app_index[perm["app_id"]], category_index[perm["category_id"]]] = (
+            PERMISSION_READ * perm["can_read"] | PERMISSION_WRITE * perm["can_write"]
+        )
     
-    return PermissionMatrixResponse(
-        apps=app_names,
-        categories=category_names,
-        permissions=permission_dict
+    body = orjson.dumps(
+        {"apps": app_names, "categories": category_names, "permissions": cells},
+        option=orjson.OPT_SERIALIZE_NUMPY
     )
+    return json_response(body)
 
 
 @router.delete("/revoke")
@@ -157,7 +186,7 @@ async def revoke_app_access(
     """Revoke all permissions for an app"""
     
     # Verify app exists
-    app = await App.get_or_none(id=app_id)
+    app = await get_app(app_id)
     if not app:
         raise HTTPException(status_code=404, detail="App not found")
     
@@ -167,6 +196,8 @@ async def revoke_app_access(
         app_id=app_id
     ).delete()
     
+    await invalidate_user_caches(user_id)
+    
     return {
         "success": True,
         "message": f"Revoked all permissions for {app.name}",
@@ -182,24 +213,14 @@ async def grant_default_permissions(
     """Grant default read permissions to an app for all categories"""
     
     # Verify app exists
-    app = await App.get_or_none(id=app_id)
+    app = await get_app(app_id)
     if not app:
         raise HTTPException(status_code=404, detail="App not found")
     
-    # Create default permission (read access to all categories)
-    permission, created = await UserAppPermission.get_or_create(
-        user_id=user_id,
-        app_id=app_id,
-        category_id=None,  # All categories
-        defaults={
-            "can_read": True,
-            "can_write": False
-        }
-    )
+    # Create default permission (read access to all categories), keeping any existing write access
+    created = await upsert_permission(user_id, app.id, None, can_read=True, can_write=False, update_write=False)
     
-    if not created:
-        permission.can_read = True
-        await permission.save()
+    await invalidate_user_caches(user_id)
     
     return {
         "success": True,
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Query, Path, HTTPException
+from fastapi import APIRouter, Query, Path, HTTPException, Depends, Header, Request
 from typing import Optional
 from app.schema.preferences import (
     TopPreferencesResponse, 
@@ -12,23 +12,37 @@ from app.schema.preferences import (
     ContextItem
 )
 from app.models.user_preference import UserPreference
-from app.models.preference_category import PreferenceCategory
+from app.utils.category_cache import get_category_by_slug
+from app.utils.app_cache import get_app
+from app.utils.response_cache import (
+    noise_counts_cache,
+    top_preferences_cache,
+    should_bypass_cache,
+    serialize_json,
+    json_response
+)
+from app.utils.clock import request_now
+from app.utils.fastapi_patches import ORJSONRoute
 from app.models.preference_source import PreferenceSource
-from app.models.query_log import QueryLog
-from app.models.app import App
+from app.utils.query_log_writer import log_query
+from app.utils.db import execute_vector_search
+from app.utils.cache_invalidation import invalidate_user_caches
 import math
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timedelta
 import numpy as np
-import random
+import orjson
+from uuid import uuid4
+from tortoise import Tortoise
 
-router = APIRouter(prefix="/preferences", tags=["preferences"])
+router = APIRouter(prefix="/preferences", tags=["preferences"], route_class=ORJSONRoute)
 
 # Configuration for game theory mechanics
 NOISE_CONFIG = {
     "base_noise": 0.1,
     "query_multiplier": 0.01,
     "contribution_divisor": 1.0,
-    "max_noise": 0.5
+    "max_noise": 0.5,
+    "demo_mode": True  # Noise disabled for demo purposes
 }
 
 SIMILARITY_CONFIG = {
@@ -38,47 +52,47 @@ SIMILARITY_CONFIG = {
 }
 
 DECAY_CONFIG = {
-    "half_life_days": 14
+    "half_life_days": 14  # Also baked into preference_decay_rank (migration 14)
 }
 
+# 0.5 ** (days / half_life) == exp(days * ln(0.5) / half_life)
+_LN_HALF_PER_DAY = math.log(0.5) / DECAY_CONFIG["half_life_days"]
+_LN_HALF_PER_SECOND = _LN_HALF_PER_DAY / (24 * 3600)
 
-def calculate_cosine_similarity(embedding1, embedding2):
-    """Calculate cosine similarity between two embeddings"""
-    # Handle None embeddings (from migration)
-    if embedding1 is None or embedding2 is None:
-        return 0
-    
-    # Convert to numpy arrays
-    try:
-        vec1 = np.array(embedding1)
-        vec2 = np.array(embedding2)
-    except (ValueError, TypeError):
-        return 0
-    
-    # Check for empty arrays
-    if vec1.size == 0 or vec2.size == 0:
-        return 0
-    
-    dot_product = np.dot(vec1, vec2)
-    norm1 = np.linalg.norm(vec1)
-    norm2 = np.linalg.norm(vec2)
-    
-    if norm1 == 0 or norm2 == 0:
-        return 0
-    
-    return dot_product / (norm1 * norm2)
+# Shared PCG64 generator for query noise (faster than the legacy np.random functions)
+_rng = np.random.default_rng()
+
+
+def normalize_embedding(embedding) -> list[float]:
+    """L2-normalize an embedding as float32; stored embeddings are unit length so cosine is a dot product"""
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
 
 
 def apply_temporal_decay(strength: float, days_since_update: float) -> float:
     """Apply temporal decay using half-life"""
-    decay_factor = math.pow(0.5, days_since_update / DECAY_CONFIG["half_life_days"])
+    decay_factor = math.exp(_LN_HALF_PER_DAY * days_since_update)
     return strength * decay_factor
 
 
+def decayed_strengths(strengths, last_updated_epochs, now: datetime) -> np.ndarray:
+    """Temporal decay applied to a batch of strengths at once (last_updated as epoch seconds)"""
+    strengths = np.asarray(strengths, dtype=np.float64)
+    seconds_since_update = now.timestamp() - np.asarray(last_updated_epochs, dtype=np.float64)
+    return strengths * np.exp(_LN_HALF_PER_SECOND * seconds_since_update)
+
+
+def to_vector_literal(embedding) -> str:
+    """pgvector text representation of an embedding, for binding as a query parameter"""
+    return orjson.dumps(np.asarray(embedding, dtype=np.float32), option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+
 def calculate_noise(queries_made: int, validated_contributions: int) -> float:
     """Calculate noise level based on query/contribution ratio"""
     # For demo purposes, return 0 noise
-    return 0.0
+    if NOISE_CONFIG["demo_mode"]:
+        return 0.0
     
     noise = min(
         NOISE_CONFIG["base_noise"] + (queries_made * NOISE_CONFIG["query_multiplier"]),
@@ -88,127 +102,191 @@ def calculate_noise(queries_made: int, validated_contributions: int) -> float:
     return max(0, min(1, noise))
 
 
+# Decay, filter, sort and limit in Postgres, then attach sources for just the top preferences.
+# preference_decay_rank (migration 14) orders rows exactly like decayed strength at any
+# instant, so the top N and the min_strength cut come straight off an index range.
+# total_count is computed over the filtered set before LIMIT.
+TOP_PREFERENCES_SQL = """
+    WITH top AS (
+        SELECT id, text, last_updated, created_at,
+               strength * exp(ln(0.5) * EXTRACT(EPOCH FROM ($3::timestamptz - last_updated)) / 86400 / $4) AS decayed_strength
+        FROM user_preferences
+        WHERE user_id = $1 AND category_id = $2
+              AND ($5::float8 IS NULL OR $5::float8 <= 0
+                   OR preference_decay_rank(strength, last_updated) >= preference_decay_rank($5::float8, $3::timestamptz))
+        ORDER BY preference_decay_rank(strength, last_updated) DESC
+        LIMIT $6
+    )
+    SELECT top.*,
+           (SELECT count(*)
+            FROM user_preferences
+            WHERE user_id = $1 AND category_id = $2
+                  AND ($5::float8 IS NULL OR $5::float8 <= 0
+                       OR preference_decay_rank(strength, last_updated) >= preference_decay_rank($5::float8, $3::timestamptz))
+           ) AS total_count,
+           s.id AS source_id, s.added_at AS source_added_at, s.strength AS source_strength,
+           a.name AS app_name
+    FROM top
+    LEFT JOIN preference_sources s ON s.preference_id = top.id
+    LEFT JOIN apps a ON a.id = s.app_id
+    ORDER BY top.decayed_strength DESC, top.id
+"""
+
+
+# Both noise inputs in one round-trip
+NOISE_COUNTS_SQL = """
+    SELECT (SELECT count(*) FROM query_logs WHERE app_id = $1 AND user_id = $2) AS queries_made,
+           (SELECT count(*) FROM preference_sources WHERE app_id = $1 AND user_id = $2) AS contributions
+"""
+
+
+async def get_noise_level(app_id: str, user_id: str) -> float:
+    """Noise level for an app's queries against a user, from cached query/contribution counts"""
+    # Noise is fixed at 0 in demo mode, so the counts would go unused
+    if NOISE_CONFIG["demo_mode"]:
+        return calculate_noise(0, 0)
+    
+    cache_key = (user_id, app_id)
+    counts = noise_counts_cache.get(cache_key)
+    if counts is None:
+        rows = await Tortoise.get_connection("default").execute_query_dict(
+            NOISE_COUNTS_SQL, [app_id, user_id]
+        )
+        counts = (rows[0]["queries_made"], rows[0]["contributions"])
+        noise_counts_cache.set(cache_key, counts)
+    
+    queries_made, contributions = counts
+    return calculate_noise(queries_made, contributions)
+
+
 @router.get("/top", response_model=TopPreferencesResponse)
 async def get_top_preferences(
+    request: Request,
     user_id: str = Query(..., description="User ID"),
     limit: int = Query(20, ge=1, le=100, description="Number of preferences to return"),
     category: Optional[str] = Query(None, description="Filter by category slug"),
-    min_strength: Optional[float] = Query(None, ge=0.0, description="Minimum strength threshold")
+    min_strength: Optional[float] = Query(None, ge=0.0, description="Minimum strength threshold"),
+    now: datetime = Depends(request_now)
 ):
     """Get user's top preferences with temporal decay applied"""
     
-    query = UserPreference.filter(user_id=user_id)
-    
     # Handle category filtering - default to health-fitness if null or "null"
     filter_category = category
     if not category or category == "null":
         filter_category = "health-fitness"
     
+    cache_key = (user_id, filter_category, limit, min_strength)
+    if not should_bypass_cache(request):
+        cached = top_preferences_cache.get(cache_key)
+        if cached is not None:
+            return json_response(cached)
+    
     if filter_category:
-        category_obj = await PreferenceCategory.get_or_none(slug=filter_category)
+        category_obj = await get_category_by_slug(filter_category)
         if not category_obj:
             raise HTTPException(status_code=404, detail="Category not found")
-        query = query.filter(category_id=category_obj.id)
-    
-    preferences = await query.select_related('category').prefetch_related('sources__app').all()
     
-    # Apply temporal decay and filter
-    now = datetime.now(timezone.utc)
-    decayed_preferences = []
+    # Top preferences by decayed strength, flattened with their sources (one row per source)
+    rows = await Tortoise.get_connection("default").execute_query_dict(
+        TOP_PREFERENCES_SQL,
+        [user_id, category_obj.id, now, DECAY_CONFIG["half_life_days"], min_strength, limit]
+    )
     
-    for pref in preferences:
-        days_since_update = (now - pref.last_updated).total_seconds() / (24 * 3600)
-        decayed_strength = apply_temporal_decay(pref.strength, days_since_update)
-        
-        if min_strength is None or decayed_strength >= min_strength:
-            pref.strength = decayed_strength  # Update for response
-            decayed_preferences.append(pref)
-    
-    # Sort by strength (descending) and limit
-    decayed_preferences.sort(key=lambda x: x.strength, reverse=True)
-    top_preferences = decayed_preferences[:limit]
-    
-    # Build response
-    preferences_data = []
-    for pref in top_preferences:
-        sources_data = [
-            {
-                "app_name": source.app.name if source.app else "User",
-                "added_at": source.added_at,
-                "strength": source.strength
+    # Group source rows under their preference (rows arrive in strength order)
+    preferences = {}
+    for row in rows:
+        pref = preferences.get(row["id"])
+        if pref is None:
+            pref = preferences[row["id"]] = {
+                "id": str(row["id"]),
+                "text": row["text"],
+                "strength": row["decayed_strength"],
+                "category_name": category_obj.name,
+                "sources": [],
+                "last_updated": row["last_updated"],
+                "created_at": row["created_at"]
             }
-            for source in pref.sources
-        ]
-        
-        preferences_data.append({
-            "id": str(pref.id),
-            "text": pref.text,
-            "strength": pref.strength,
-            "category_name": pref.category.name if pref.category else None,
-            "sources": sources_data,
-            "last_updated": pref.last_updated,
-            "created_at": pref.created_at
-        })
-    
-    return TopPreferencesResponse(
-        preferences=preferences_data,
-        total_count=len(decayed_preferences)
+        if row["source_id"] is not None:
+            pref["sources"].append({
+                "app_name": row["app_name"] or "User",
+                "added_at": row["source_added_at"],
+                "strength": row["source_strength"]
+            })
+    
+    response = TopPreferencesResponse(
+        preferences=list(preferences.values()),
+        total_count=rows[0]["total_count"] if rows else 0
+    )
+    body = serialize_json(response)
+    top_preferences_cache.set(cache_key, body)
+    return json_response(body)
+
+
+# Nearest same-category preference over the merge threshold (negative inner product
+# < $4; embeddings are unit length), boosted and given a user-added source row in a single round-trip
+BOOST_SIMILAR_PREFERENCE_SQL = """
+    WITH candidate AS (
+        SELECT id
+        FROM user_preferences
+        WHERE user_id = $1 AND category_id IS NOT DISTINCT FROM $2
+              AND embedding <#> $3::text::halfvec < $4
+        ORDER BY embedding <#> $3::text::halfvec
+        LIMIT 1
+        FOR UPDATE
+    ), boosted AS (
+        UPDATE user_preferences p
+        SET strength = LEAST(p.strength + $5, $6), last_updated = $7
+        FROM candidate
+        WHERE p.id = candidate.id
+        RETURNING p.id, p.text, p.strength, p.created_at
+    ), source AS (
+        INSERT INTO preference_sources (id, preference_id, app_id, user_id, strength, added_at)
+        SELECT $8::uuid, id, NULL, $1::uuid, $9::float8, $7::timestamptz FROM boosted
     )
+    SELECT * FROM boosted
+"""
 
 
 @router.post("/add", response_model=AddPreferenceResponse)
 async def add_preference(
     user_id: str = Query(..., description="User ID"),
-    request: AddPreferenceRequest = ...
+    request: AddPreferenceRequest = ...,
+    now: datetime = Depends(request_now)
 ):
     """Add a new preference or strengthen existing similar preference"""
     
     # Get category if specified
     category_obj = None
     if request.category_slug:
-        category_obj = await PreferenceCategory.get_or_none(slug=request.category_slug)
+        category_obj = await get_category_by_slug(request.category_slug)
         if not category_obj:
             raise HTTPException(status_code=404, detail="Category not found")
     
-    # Check for similar existing preferences
-    existing_preferences = await UserPreference.filter(
-        user_id=user_id,
-        category_id=category_obj.id if category_obj else None
-    ).all()
-    
-    # Find most similar preference
-    best_match = None
-    best_similarity = 0
-    
-    for existing in existing_preferences:
-        similarity = calculate_cosine_similarity(request.embedding, existing.embedding)
-        if similarity > best_similarity and similarity > SIMILARITY_CONFIG["merge_threshold"]:
-            best_similarity = similarity
-            best_match = existing
+    embedding = normalize_embedding(request.embedding)
+    
+    # Strengthen the most similar existing preference over the merge threshold, if any,
+    # and record its source - find, boost and insert run as one statement
+    boosted = await Tortoise.get_connection("default").execute_query_dict(
+        BOOST_SIMILAR_PREFERENCE_SQL,
+        [
+            user_id, category_obj.id if category_obj else None, to_vector_literal(embedding),
+            -SIMILARITY_CONFIG["merge_threshold"],
+            SIMILARITY_CONFIG["strength_boost"] * request.strength, SIMILARITY_CONFIG["max_strength"],
+            now, str(uuid4()), request.strength
+        ]
+    )
+    best_match = boosted[0] if boosted else None
     
     if best_match:
-        # Strengthen existing preference
-        best_match.strength = min(
-            best_match.strength + SIMILARITY_CONFIG["strength_boost"] * request.strength,
-            SIMILARITY_CONFIG["max_strength"]
-        )
-        best_match.last_updated = datetime.now(timezone.utc)
-        await best_match.save()
-        
-        # Add source entry (user-added)
-        await PreferenceSource.create(
-            preference_id=best_match.id,
-            app_id=None,  # User-added
-            user_id=user_id,
-            strength=request.strength
-        )
+        # Boosted strength changes the user's top preferences
+        await invalidate_user_caches(user_id)
         
         return AddPreferenceResponse(
-            id=str(best_match.id),
-            text=best_match.text,
-            strength=best_match.strength,
+            id=str(best_match["id"]),
+            text=best_match["text"],
+            strength=best_match["strength"],
             category_name=category_obj.name if category_obj else None,
-            created_at=best_match.created_at
+            created_at=best_match["created_at"]
         )
     else:
         # Create new preference
@@ -216,7 +294,7 @@ async def add_preference(
             user_id=user_id,
             category_id=category_obj.id if category_obj else None,
             text=request.text,
-            embedding=request.embedding,
+            embedding=embedding,
             strength=request.strength
         )
         
@@ -228,6 +306,9 @@ async def add_preference(
             strength=request.strength
         )
         
+        # New preference changes the user's category counts
+        await invalidate_user_caches(user_id)
+        
         return AddPreferenceResponse(
             id=str(new_preference.id),
             text=new_preference.text,
@@ -240,7 +321,8 @@ async def add_preference(
 @router.get("/{preference_id}", response_model=PreferenceDetailResponse)
 async def get_preference_detail(
     preference_id: str = Path(..., description="Preference ID"),
-    user_id: str = Query(..., description="User ID")
+    user_id: str = Query(..., description="User ID"),
+    now: datetime = Depends(request_now)
 ):
     """Get detailed information about a specific preference"""
     
@@ -253,8 +335,7 @@ async def get_preference_detail(
         raise HTTPException(status_code=404, detail="Preference not found")
     
     # Calculate temporal decay info
-    now = datetime.now(timezone.utc)
-    days_since_update = (now - preference.last_updated).total_seconds() / (24 * 3600)
+    days_since_update = (now.timestamp() - preference.last_updated_epoch) / (24 * 3600)
     current_strength = apply_temporal_decay(preference.strength, days_since_update)
     
     temporal_info = {
@@ -287,36 +368,105 @@ async def get_preference_detail(
     )
 
 
+# Nearest-neighbour candidates reranked with temporal decay by /query
+QUERY_CANDIDATES = 50
+
+# Nearest-neighbour search shortlists RERANK_OVERSAMPLE x the candidates by Hamming distance
+# between binary-quantized embeddings (HNSW index from migration 13), then reranks the
+# shortlist by exact inner product (cosine, since both sides are unit length). Queries run
+# through execute_vector_search, whose iterative index scan (pgvector 0.8+) fills the
+# shortlist with the user's own rows even though the index covers every user
+RERANK_OVERSAMPLE = 4
+
+# hnsw.ef_search caps how many rows an HNSW scan returns, so it never goes below the
+# shortlist size; an X-Recall header above DEFAULT_RECALL raises it linearly, reaching
+# pgvector's max of MAX_EF_SEARCH at a recall target of 1.0
+DEFAULT_RECALL = 0.9
+MAX_EF_SEARCH = 1000
+
+
+async def vector_search_ef(
+    x_recall: Optional[float] = Header(None, gt=0, le=1, description="Recall target for nearest-neighbour search")
+) -> int:
+    """hnsw.ef_search for this request's nearest-neighbour queries"""
+    shortlist = QUERY_CANDIDATES * RERANK_OVERSAMPLE
+    recall = x_recall if x_recall is not None else DEFAULT_RECALL
+    fraction = max(0.0, (recall - DEFAULT_RECALL) / (1 - DEFAULT_RECALL))
+    return min(MAX_EF_SEARCH, shortlist + round((MAX_EF_SEARCH - shortlist) * fraction))
+
+NEAREST_PREFERENCES_SQL = """
+    SELECT -(embedding <#> $1::text::halfvec) AS similarity, strength,
+           EXTRACT(EPOCH FROM last_updated)::float8 AS last_updated_epoch
+    FROM (
+        SELECT embedding, strength, last_updated
+        FROM user_preferences
+        WHERE user_id = $2
+        ORDER BY binary_quantize(embedding)::bit(384) <~> binary_quantize($1::text::halfvec)
+        LIMIT $4
+    ) shortlist
+    ORDER BY embedding <#> $1::text::halfvec
+    LIMIT $3
+"""
+
+
+NEAREST_CONTEXTS_SQL = """
+    SELECT q.query_index, n.*
+    FROM unnest($1::text[]) WITH ORDINALITY AS q(embedding, query_index)
+    CROSS JOIN LATERAL (
+        SELECT shortlist.id, shortlist.text, c.name AS category_name, shortlist.strength,
+               EXTRACT(EPOCH FROM shortlist.last_updated)::float8 AS last_updated_epoch,
+               -(shortlist.embedding <#> q.embedding::halfvec) AS similarity
+        FROM (
+            SELECT id, text, category_id, strength, last_updated, embedding
+            FROM user_preferences
+            WHERE user_id = $2 AND embedding IS NOT NULL
+            ORDER BY binary_quantize(embedding)::bit(384) <~> binary_quantize(q.embedding::halfvec)
+            LIMIT $4
+        ) shortlist
+        LEFT JOIN preference_categories c ON c.id = shortlist.category_id
+        ORDER BY shortlist.embedding <#> q.embedding::halfvec
+        LIMIT $3
+    ) n
+    ORDER BY q.query_index
+"""
+
+
 @router.post("/query", response_model=QueryResponse)
 async def query_preferences(
     user_id: str = Query(..., description="User ID"),
     app_id: str = Query(..., description="App ID for noise calculation"),
-    request: QueryRequest = ...
+    request: QueryRequest = ...,
+    now: datetime = Depends(request_now),
+    ef_search: int = Depends(vector_search_ef)
 ):
     """Query user preferences with similarity search and noise injection"""
     
     # Get app for noise calculation
-    app = await App.get_or_none(id=app_id)
+    app = await get_app(app_id)
     if not app:
         raise HTTPException(status_code=404, detail="App not found")
     
     # Calculate noise level
-    queries_made = await QueryLog.filter(app_id=app_id, user_id=user_id).count()
-    contributions = await PreferenceSource.filter(app_id=app_id, user_id=user_id).count()
-    noise_level = calculate_noise(queries_made, contributions)
-    
-    # Get user preferences
-    preferences = await UserPreference.filter(user_id=user_id).all()
+    noise_level = await get_noise_level(app_id, user_id)
+    
+    # Get the nearest preferences by inner product (shortlisted via the binary-quantized index);
+    # preferences without an embedding sort last with a NULL similarity
+    preferences = await execute_vector_search(
+        NEAREST_PREFERENCES_SQL,
+        [to_vector_literal(normalize_embedding(request.embedding)), user_id, QUERY_CANDIDATES, QUERY_CANDIDATES * RERANK_OVERSAMPLE],
+        ef_search
+    )
     
     if not preferences:
         # Log query
-        await QueryLog.create(
+        await log_query(
             app_id=app_id,
             user_id=user_id,
             embedding=request.embedding,
             result=0.0,
             context=request.context,
-            noise_level=noise_level
+            noise_level=noise_level,
+            timestamp=now
         )
         
         return QueryResponse(
@@ -325,42 +475,31 @@ async def query_preferences(
             noise_level=noise_level
         )
     
-    # Find best matching preference
-    best_score = 0
-    best_preference = None
-    
-    now = datetime.now(timezone.utc)
-    
-    for pref in preferences:
-        # Calculate similarity
-        similarity = calculate_cosine_similarity(request.embedding, pref.embedding)
-        
-        # Apply temporal decay
-        days_since_update = (now - pref.last_updated).total_seconds() / (24 * 3600)
-        decayed_strength = apply_temporal_decay(pref.strength, days_since_update)
-        
-        # Combined score
-        score = similarity * min(decayed_strength, 1.0)  # Cap at 1.0 for scoring
-        
-        if score > best_score:
-            best_score = score
-            best_preference = pref
+    # Rerank candidates: cosine similarity x decayed strength (capped at 1.0)
+    similarities = np.array([row["similarity"] or 0.0 for row in preferences], dtype=np.float64)
+    strengths = decayed_strengths(
+        [row["strength"] for row in preferences], [row["last_updated_epoch"] for row in preferences], now
+    )
+    scores = similarities * np.minimum(strengths, 1.0)
+    best_score = max(0, float(scores.max()))
     
     # Add noise
-    noise_amount = np.random.normal(0, noise_level)
+    noise_amount = _rng.normal(0, noise_level)
     noisy_score = max(0, min(1, best_score + noise_amount))
     
     # Confidence based on how many preferences we have and best similarity
+    # (saturates at 10 preferences, well below QUERY_CANDIDATES)
     confidence = min(1.0, len(preferences) / 10.0) * (1 - noise_level)
     
     # Log query
-    await QueryLog.create(
+    await log_query(
         app_id=app_id,
         user_id=user_id,
         embedding=request.embedding,
         result=noisy_score,
         context=request.context,
-        noise_level=noise_level
+        noise_level=noise_level,
+        timestamp=now
     )
     
     return QueryResponse(
@@ -374,83 +513,79 @@ async def query_preferences(
 async def query_contexts(
     request: QueryContextsRequest,
     user_id: str = Query(..., description="User ID"),
-    app_id: str = Query(..., description="App ID for noise calculation")
+    app_id: str = Query(..., description="App ID for noise calculation"),
+    now: datetime = Depends(request_now),
+    ef_search: int = Depends(vector_search_ef)
 ):
     """Query user preferences with multiple embeddings, returning top 3 contexts per embedding"""
     
     # Calculate noise level
-    queries_made = await QueryLog.filter(app_id=app_id, user_id=user_id).count()
-    contributions = await PreferenceSource.filter(app_id=app_id, user_id=user_id).count()
-    noise_level = calculate_noise(queries_made, contributions)
-    
-    # Get all user preferences
-    preferences = await UserPreference.filter(user_id=user_id).select_related('category').all()
-    
-    if not preferences:
-        return QueryContextsResponse(
-            results=[[] for _ in request.embeddings],
-            noise_level=noise_level
-        )
+    noise_level = await get_noise_level(app_id, user_id)
+    
+    # Get each embedding's nearest preferences in one round-trip (LATERAL runs the
+    # shortlist-and-rerank nearest-neighbour search once per query embedding)
+    rows = await execute_vector_search(
+        NEAREST_CONTEXTS_SQL,
+        [
+            [to_vector_literal(normalize_embedding(embedding)) for embedding in request.embeddings],
+            user_id, QUERY_CANDIDATES, QUERY_CANDIDATES * RERANK_OVERSAMPLE
+        ],
+        ef_search
+    )
     
     # Apply noise filtering - randomly exclude preferences based on noise level
-    filtered_preferences = []
-    for pref in preferences:
-        if random.random() > noise_level:  # Include if random roll beats noise
-            filtered_preferences.append(pref)
-    
-    # Process each embedding
-    results = []
-    now = datetime.now(timezone.utc)
-    
-    for query_embedding in request.embeddings:
-        # Calculate similarities for all filtered preferences
-        similarities = []
-        
-        for pref in filtered_preferences:
-            # Skip preferences with null embeddings (from migration)
-            if pref.embedding is None:
-                continue
-                
-            # Calculate cosine similarity
-            similarity = calculate_cosine_similarity(query_embedding, pref.embedding)
-            
-            # Apply temporal decay to strength
-            days_since_update = (now - pref.last_updated).total_seconds() / (24 * 3600)
-            decayed_strength = apply_temporal_decay(pref.strength, days_since_update)
-            
-            # Final score combines similarity and decayed strength
-            final_score = similarity * min(decayed_strength / 10.0, 1.0)  # Normalize strength
-            
-            similarities.append({
-                'preference': pref,
-                'score': final_score,
-                'similarity': similarity
-            })
+    # (one roll per preference, shared by every query embedding)
+    preference_ids = list({row["id"] for row in rows})
+    keep = _rng.random(len(preference_ids)) > noise_level  # Excluded unless the random roll beats noise
+    kept_ids = set(np.asarray(preference_ids, dtype=object)[keep]) if preference_ids else set()
+    candidates = [row for row in rows if row["id"] in kept_ids]
+    
+    # Rerank all candidates at once: final score combines similarity and decayed strength (normalized by 10)
+    results = [[] for _ in request.embeddings]
+    
+    if candidates:
+        similarities = np.array([row["similarity"] for row in candidates], dtype=np.float64)
+        weights = np.minimum(
+            decayed_strengths([row["strength"] for row in candidates], [row["last_updated_epoch"] for row in candidates], now) / 10.0,
+            1.0
+        )
+        scores = similarities * weights
         
-        # Sort by score and take top 3
-        similarities.sort(key=lambda x: x['score'], reverse=True)
-        top_3 = similarities[:3]
+        # Rows arrive grouped by query embedding; lay scores out as a (query, slot) matrix
+        # padded with -inf and take each query's top 3 with argpartition instead of sorting
+        query_indices = np.array([row["query_index"] - 1 for row in candidates])
+        slots = np.arange(len(candidates)) - np.searchsorted(query_indices, query_indices)
+        score_matrix = np.full((len(request.embeddings), int(slots.max()) + 1), -np.inf)
+        score_matrix[query_indices, slots] = scores
+        row_matrix = np.full(score_matrix.shape, -1)
+        row_matrix[query_indices, slots] = np.arange(len(candidates))
         
-        # Build context items
-        contexts = []
-        for item in top_3:
-            contexts.append(ContextItem(
-                text=item['preference'].text,
-                category=item['preference'].category.name if item['preference'].category else None,
-                score=item['similarity']  # Return raw similarity score, not combined score
-            ))
+        k = min(3, score_matrix.shape[1])
+        top = np.argpartition(-score_matrix, k - 1, axis=1)[:, :k]
+        top = np.take_along_axis(
+            top, np.argsort(-np.take_along_axis(score_matrix, top, axis=1), axis=1, kind="stable"), axis=1
+        )
         
-        results.append(contexts)
+        # Build context items only for the selected rows (padding slots hold row -1)
+        for query_index, top_rows in enumerate(np.take_along_axis(row_matrix, top, axis=1)):
+            for i in top_rows[top_rows >= 0]:
+                row = candidates[i]
+                results[query_index].append(ContextItem(
+                    text=row["text"],
+                    category=row["category_name"],
+                    score=float(similarities[i])  # Return raw similarity score, not combined score
+                ))
     
     # Log queries
     for embedding in request.embeddings:
-        await QueryLog.create(
+        await log_query(
             app_id=app_id,
             user_id=user_id,
             embedding=embedding,
-            result=len(filtered_preferences),  # Log how many prefs were available after filtering
+            result=len(kept_ids),  # Log how many shortlisted prefs survived the noise filter
             context=request.context,
-            noise_level=noise_level
+            noise_level=noise_level,
+            timestamp=now
         )
     
     return QueryContextsResponse(
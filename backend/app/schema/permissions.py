@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Dict, List
+from typing import List
 
 
 class CategoryPermission(BaseModel):
@@ -40,4 +40,4 @@ class UpdatePermissionResponse(BaseModel):
 class PermissionMatrixResponse(BaseModel):
     apps: List[str]  # app names
     categories: List[str]  # category names
-    permissions: Dict[str, Dict[str, dict]]  # {app_id: {category_id: {can_read, can_write}}}
\ No newline at end of file
+    permissions: List[List[int]]  # [app][category] bitmask: 1 = can_read, 2 = can_write (0 = no permission)
\ No newline at end of file
@@ -1,6 +1,6 @@
 from returns.result import Result, Success, Failure
 from returns.maybe import Nothing
-from app.models import OAuthClient
+from app.utils.oauth_cache import get_client
 from app.utils.errors import NotFoundError, AppError
 from .pipeline import OAuthAuthorizationPipeline
 
@@ -13,7 +13,7 @@ async def validate_client(data: OAuthAuthorizationPipeline) -> Result[OAuthAutho
     
     try:
         client_id = data.client_id.unwrap()
-        client = await OAuthClient.get_or_none(client_id=client_id)
+        client = await get_client(client_id)
         
         if not client:
             return Failure(NotFoundError(f"OAuth client '{client_id}' not found"))
@@ -23,8 +23,8 @@ async def validate_client(data: OAuthAuthorizationPipeline) -> Result[OAuthAutho
             "id": str(client.id),
             "name": client.name,
             "client_id": client.client_id,
-            "redirect_uris": client.redirect_uris,
-            "allowed_scopes": client.allowed_scopes,
+            "redirect_uris": list(client.redirect_uris),
+            "allowed_scopes": list(client.allowed_scopes),
             "is_public": client.is_public
         }
         
@@ -0,0 +1,55 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from uuid import UUID
+from app.models.app import App
+
+# Apps are looked up on every preference query but are rarely edited
+APP_CACHE_TTL = 60
+APP_CACHE_MAXSIZE = 1024
+
+
+@dataclass(frozen=True, slots=True)
+class CachedApp:
+    """Immutable snapshot of an App row"""
+    id: UUID
+    name: str
+    description: Optional[str]
+    is_active: bool
+    created_at: datetime
+
+
+_apps: Dict[str, Tuple[float, CachedApp]] = {}
+_lock = asyncio.Lock()
+
+
+async def get_app(app_id: str) -> Optional[CachedApp]:
+    """Get an app by id, hitting the database only on a cache miss"""
+    key = str(app_id)
+    entry = _apps.get(key)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1]
+
+    async with _lock:
+        entry = _apps.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+
+        rows = await App.filter(id=app_id).values("id", "name", "description", "is_active", "created_at")
+        # Don't cache misses - the app may be registered later
+        if not rows:
+            return None
+
+        snapshot = CachedApp(**rows[0])
+        if len(_apps) >= APP_CACHE_MAXSIZE:
+            _apps.pop(next(iter(_apps)))
+        _apps[key] = (time.monotonic() + APP_CACHE_TTL, snapshot)
+
+    return snapshot
+
+
+def invalidate_app(app_id: str):
+    """Drop a cached app (call after the app is edited or deleted)"""
+    _apps.pop(str(app_id), None)
@@ -1,3 +1,4 @@
+import asyncio
 from datetime import datetime, timedelta
 from typing import Optional
 import os
@@ -72,6 +73,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
 async def authenticate_user(email: str, password: str) -> Optional[User]:
     """Authenticate user with email and password."""
     user = await User.get_or_none(email=email, is_active=True)
-    if not user or not verify_password(password, user.password_hash):
+    # bcrypt is deliberately slow - verify in a worker thread to keep the event loop free
+    if not user or not await asyncio.to_thread(verify_password, password, user.password_hash):
         return None
     return user
\ No newline at end of file
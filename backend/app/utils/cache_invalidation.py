@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import secrets
+from typing import Any, Dict, Hashable, Optional
+import asyncpg
+import orjson
+from tortoise import Tortoise
+from app.utils.category_cache import clear_category_cache, load_categories
+from app.utils.response_cache import categories_cache, clear_response_caches, invalidate_local_user_caches
+
+logger = logging.getLogger(__name__)
+
+# Every worker keeps its own in-process caches, so invalidations are applied locally and
+# broadcast to the other workers with Postgres NOTIFY on this channel
+CHANNEL = "vault_cache_invalidation"
+RECONNECT_DELAY = 5  # Seconds
+
+# Identifies this process so it can skip its own broadcasts (already applied locally)
+_ORIGIN = secrets.token_hex(8)
+
+_listener: Optional[asyncio.Task] = None
+
+
+async def _publish(message: Dict[str, Any]):
+    try:
+        await Tortoise.get_connection("default").execute_query(
+            "SELECT pg_notify($1, $2)", [CHANNEL, orjson.dumps({**message, "origin": _ORIGIN}).decode()]
+        )
+    except Exception:
+        # Other workers still converge once their cache entries expire
+        logger.exception("Failed to broadcast cache invalidation")
+
+
+async def invalidate_user_caches(user_id: Hashable):
+    """Drop cached results for a user in every worker (call after a write that changes them)"""
+    invalidate_local_user_caches(user_id)
+    await _publish({"kind": "user", "user_id": str(user_id)})
+
+
+async def invalidate_categories():
+    """Reload categories in this worker and drop them in every other one (call after they change)"""
+    await load_categories()
+    categories_cache.clear()
+    await _publish({"kind": "categories"})
+
+
+def _clear_local_caches():
+    clear_category_cache()
+    clear_response_caches()
+
+
+def _on_notification(connection, pid, channel, payload):
+    try:
+        message = orjson.loads(payload)
+    except orjson.JSONDecodeError:
+        logger.warning("Ignoring malformed cache invalidation: %r", payload)
+        return
+
+    if message.get("origin") == _ORIGIN:
+        return
+
+    if message.get("kind") == "user":
+        invalidate_local_user_caches(message["user_id"])
+    elif message.get("kind") == "categories":
+        # Refilled lazily by get_category_by_slug / get_category_by_id
+        clear_category_cache()
+        categories_cache.clear()
+
+
+async def _listen(dsn: str):
+    reconnecting = False
+    while True:
+        connection = None
+        try:
+            connection = await asyncpg.connect(dsn)
+            closed = asyncio.Event()
+            connection.add_termination_listener(lambda _: closed.set())
+            await connection.add_listener(CHANNEL, _on_notification)
+
+            # Broadcasts sent while disconnected were missed, so start again from empty caches
+            if reconnecting:
+                _clear_local_caches()
+            reconnecting = True
+            await closed.wait()
+            logger.warning("Cache invalidation listener disconnected, reconnecting")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Cache invalidation listener failed, reconnecting")
+        finally:
+            if connection is not None and not connection.is_closed():
+                await connection.close()
+        await asyncio.sleep(RECONNECT_DELAY)
+
+
+async def start_cache_invalidation_listener(dsn: str):
+    """Start listening for other workers' invalidations (call on application startup)"""
+    global _listener
+    if _listener is None or _listener.done():
+        _listener = asyncio.create_task(_listen(dsn))
+
+
+async def stop_cache_invalidation_listener():
+    """Stop listening for invalidations (call on application shutdown)"""
+    global _listener
+    if _listener is not None:
+        _listener.cancel()
+        try:
+            await _listener
+        except asyncio.CancelledError:
+            pass
+    _listener = None
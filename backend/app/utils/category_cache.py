@@ -0,0 +1,64 @@
+import asyncio
+from typing import Dict, Optional
+from app.models.preference_category import PreferenceCategory
+
+# Categories are seeded once and rarely change, so keep them in-process
+_categories_by_slug: Dict[str, PreferenceCategory] = {}
+_categories_by_id: Dict[str, PreferenceCategory] = {}
+_lock = asyncio.Lock()
+
+
+async def get_category_by_slug(slug: str) -> Optional[PreferenceCategory]:
+    """Get a preference category by slug, hitting the database only on a cache miss"""
+    category = _categories_by_slug.get(slug)
+    if category is not None:
+        return category
+
+    async with _lock:
+        category = _categories_by_slug.get(slug)
+        if category is None:
+            category = await PreferenceCategory.get_or_none(slug=slug)
+            # Don't cache misses - the category may be seeded later
+            if category is not None:
+                _remember(category)
+
+    return category
+
+
+async def get_category_by_id(category_id: str) -> Optional[PreferenceCategory]:
+    """Get a preference category by id, hitting the database only on a cache miss"""
+    key = str(category_id)
+    category = _categories_by_id.get(key)
+    if category is not None:
+        return category
+
+    async with _lock:
+        category = _categories_by_id.get(key)
+        if category is None:
+            category = await PreferenceCategory.get_or_none(id=category_id)
+            # Don't cache misses - the category may be seeded later
+            if category is not None:
+                _remember(category)
+
+    return category
+
+
+def _remember(category: PreferenceCategory):
+    _categories_by_slug[category.slug] = category
+    _categories_by_id[str(category.id)] = category
+
+
+async def load_categories():
+    """Replace the cache with every category in one query (call on startup and after changes)"""
+    categories = await PreferenceCategory.all()
+    async with _lock:
+        _categories_by_slug.clear()
+        _categories_by_id.clear()
+        for category in categories:
+            _remember(category)
+
+
+def clear_category_cache():
+    """Drop all cached categories (call after categories are created or changed)"""
+    _categories_by_slug.clear()
+    _categories_by_id.clear()
@@ -0,0 +1,11 @@
+from datetime import datetime, timezone
+
+
+async def request_now() -> datetime:
+    """Current UTC time, resolved once per request.
+
+    FastAPI caches dependency results per request, so every `Depends(request_now)`
+    within a request sees the same timestamp. Async so it runs on the event loop
+    rather than being dispatched to the threadpool.
+    """
+    return datetime.now(timezone.utc)
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+from typing import Optional
+from urllib.parse import urlencode
+from tortoise import Tortoise
+from tortoise.transactions import in_transaction
+
+logger = logging.getLogger(__name__)
+
+# asyncpg keeps a per-connection cache of prepared statements keyed by SQL text,
+# so the same parametrized ORM queries skip the parse/plan phase on reuse
+STATEMENT_CACHE_OPTIONS = {
+    "statement_cache_size": 1024,
+    "max_cached_statement_lifetime": 300,
+}
+
+
+def with_statement_cache(db_url: Optional[str]) -> Optional[str]:
+    """Append asyncpg statement cache options to a database URL"""
+    if not db_url:
+        return db_url
+    
+    separator = "&" if "?" in db_url else "?"
+    return f"{db_url}{separator}{urlencode(STATEMENT_CACHE_OPTIONS)}"
+
+
+# Monthly query_logs partitions (migrations 16 and 20) to keep ready ahead of time,
+# re-checked daily so a long-running process never outruns them
+QUERY_LOG_PARTITION_MONTHS_AHEAD = 3
+QUERY_LOG_PARTITION_INTERVAL = 24 * 60 * 60  # Seconds
+
+_partition_maintainer: Optional[asyncio.Task] = None
+
+
+async def ensure_query_log_partitions(months_ahead: int = QUERY_LOG_PARTITION_MONTHS_AHEAD):
+    """Create any missing query_logs partitions from this month through `months_ahead` months out"""
+    try:
+        await Tortoise.get_connection("default").execute_query(
+            "SELECT create_query_log_partitions(CURRENT_DATE, (CURRENT_DATE + make_interval(months => $1))::date)",
+            [months_ahead]
+        )
+    except Exception:
+        # Rows still land in the default partition, so never block startup on this
+        logger.exception("Failed to create query_logs partitions")
+
+
+async def _maintain_query_log_partitions():
+    while True:
+        await ensure_query_log_partitions()
+        await asyncio.sleep(QUERY_LOG_PARTITION_INTERVAL)
+
+
+async def start_query_log_partition_maintenance():
+    """Create upcoming query_logs partitions now and daily after that (call on application startup)"""
+    global _partition_maintainer
+    if _partition_maintainer is None or _partition_maintainer.done():
+        _partition_maintainer = asyncio.create_task(_maintain_query_log_partitions())
+
+
+async def stop_query_log_partition_maintenance():
+    """Stop the daily partition check (call on application shutdown)"""
+    global _partition_maintainer
+    if _partition_maintainer is not None:
+        _partition_maintainer.cancel()
+        try:
+            await _partition_maintainer
+        except asyncio.CancelledError:
+            pass
+    _partition_maintainer = None
+
+
+# Preference table and the indexes behind /query, /query-contexts and /top
+PREWARM_RELATIONS = ("user_preferences", "idx_up_emb_bq_hnsw", "idx_up_user_category_decay_rank")
+
+
+async def prewarm_relations(relations=PREWARM_RELATIONS):
+    """Load relations into shared_buffers with pg_prewarm so the first queries don't read from disk"""
+    connection = Tortoise.get_connection("default")
+    try:
+        await connection.execute_script("CREATE EXTENSION IF NOT EXISTS pg_prewarm")
+        rows = await connection.execute_query_dict(
+            """
+            SELECT relation, pg_prewarm(to_regclass(relation)) AS blocks,
+                   current_setting('shared_buffers') AS shared_buffers
+            FROM unnest($1::text[]) AS relation
+            WHERE to_regclass(relation) IS NOT NULL
+            """,
+            [list(relations)]
+        )
+    except Exception:
+        # Needs the pg_prewarm extension (contrib); never block startup on it
+        logger.exception("Failed to prewarm relations")
+        return
+    
+    for row in rows:
+        logger.info("Prewarmed %s: %d blocks (shared_buffers=%s)", row["relation"], row["blocks"], row["shared_buffers"])
+
+
+async def execute_vector_search(sql: str, values: list, ef_search: int):
+    """Run a nearest-neighbour query with HNSW scan settings applied to its transaction only
+
+    The HNSW index spans every user, so the `user_id` filter is applied to the rows the
+    scan returns. Iterative scans (pgvector 0.8+) keep scanning until the LIMIT is filled
+    with the user's own rows instead of stopping after ef_search rows across all users.
+    """
+    async with in_transaction() as connection:
+        # SET can't take bind parameters; ef_search is always an int from the caller
+        await connection.execute_script(
+            f"SET LOCAL hnsw.ef_search = {int(ef_search)}; SET LOCAL hnsw.iterative_scan = relaxed_order"
+        )
+        return await connection.execute_query_dict(sql, values)
@@ -0,0 +1,49 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+from functools import lru_cache
+from typing import Any, Dict
+import orjson
+
+# Payloads larger than this are signed off the event loop
+ASYNC_JWT_THRESHOLD_BYTES = int(os.getenv("ASYNC_JWT_THRESHOLD_BYTES", "512"))
+
+# Header is identical for every token we issue, so encode it once
+_HEADER_SEGMENT = base64.urlsafe_b64encode(b'{"alg":"HS256","typ":"JWT"}').rstrip(b"=")
+
+
+def _b64url(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+@lru_cache(maxsize=8)
+def _keyed_hmac(secret: str) -> "hmac.HMAC":
+    """HMAC context with the key already absorbed; copy() it per signature"""
+    return hmac.new(secret.encode(), None, hashlib.sha256)
+
+
+def _sign(payload_json: bytes, secret: str) -> str:
+    signing_input = _HEADER_SEGMENT + b"." + _b64url(payload_json)
+    mac = _keyed_hmac(secret).copy()
+    mac.update(signing_input)
+    signature = mac.digest()
+    return (signing_input + b"." + _b64url(signature)).decode("ascii")
+
+
+def encode_hs256(payload: Dict[str, Any], secret: str) -> str:
+    """Sign a payload as an HS256 JWT (compatible with PyJWT/python-jose decoding)"""
+    return _sign(orjson.dumps(payload), secret)
+
+
+async def encode_hs256_async(payload: Dict[str, Any], secret: str) -> str:
+    """Like encode_hs256, but signs large payloads in a worker thread.
+
+    Signing a typical token takes a few microseconds - far less than a thread hand-off -
+    so only payloads above ASYNC_JWT_THRESHOLD_BYTES are offloaded.
+    """
+    payload_json = orjson.dumps(payload)
+    if len(payload_json) > ASYNC_JWT_THRESHOLD_BYTES:
+        return await asyncio.to_thread(_sign, payload_json, secret)
+    return _sign(payload_json, secret)
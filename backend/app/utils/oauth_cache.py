@@ -0,0 +1,65 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional, Tuple
+from uuid import UUID
+from app.models.oauth_client import OAuthClient
+
+# OAuth clients are read on every OAuth call but only change when registered/edited
+CLIENT_CACHE_TTL = 60
+CLIENT_CACHE_MAXSIZE = 1024
+
+
+@dataclass(frozen=True, slots=True)
+class CachedOAuthClient:
+    """Immutable snapshot of an OAuthClient row"""
+    id: UUID
+    name: str
+    description: Optional[str]
+    client_id: str
+    client_secret: str
+    is_public: bool
+    redirect_uris: FrozenSet[str]
+    allowed_scopes: FrozenSet[str]
+
+
+_clients: Dict[str, Tuple[float, CachedOAuthClient]] = {}
+_lock = asyncio.Lock()
+
+
+async def get_client(client_id: str) -> Optional[CachedOAuthClient]:
+    """Get an OAuth client by client_id, hitting the database only on a cache miss"""
+    entry = _clients.get(client_id)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1]
+
+    async with _lock:
+        entry = _clients.get(client_id)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+
+        client = await OAuthClient.get_or_none(client_id=client_id)
+        # Don't cache misses - the client may be registered later
+        if client is None:
+            return None
+
+        snapshot = CachedOAuthClient(
+            id=client.id,
+            name=client.name,
+            description=getattr(client, "description", None),
+            client_id=client.client_id,
+            client_secret=client.client_secret,
+            is_public=client.is_public,
+            redirect_uris=frozenset(client.redirect_uris),
+            allowed_scopes=frozenset(client.allowed_scopes)
+        )
+        if len(_clients) >= CLIENT_CACHE_MAXSIZE:
+            _clients.pop(next(iter(_clients)))
+        _clients[client_id] = (time.monotonic() + CLIENT_CACHE_TTL, snapshot)
+
+    return snapshot
+
+
+def invalidate_client(client_id: str):
+    """Drop a cached client (call after the client is edited or deleted)"""
+    _clients.pop(client_id, None)
@@ -0,0 +1,45 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+from app.models.oauth_authorization_code import OAuthAuthorizationCode
+
+logger = logging.getLogger(__name__)
+
+# Authorization codes live 10 minutes; unused ones are never consumed, so purge them periodically
+SWEEP_INTERVAL = 600  # Seconds
+
+_sweeper: Optional[asyncio.Task] = None
+
+
+async def purge_expired_authorization_codes() -> int:
+    """Delete expired authorization codes (served by the expires_at index)"""
+    return await OAuthAuthorizationCode.filter(expires_at__lt=datetime.now(timezone.utc)).delete()
+
+
+async def _sweep():
+    while True:
+        try:
+            await purge_expired_authorization_codes()
+        except Exception:
+            logger.exception("Failed to purge expired authorization codes")
+        await asyncio.sleep(SWEEP_INTERVAL)
+
+
+async def start_oauth_sweeper():
+    """Start the periodic purge (call on application startup)"""
+    global _sweeper
+    if _sweeper is None or _sweeper.done():
+        _sweeper = asyncio.create_task(_sweep())
+
+
+async def stop_oauth_sweeper():
+    """Stop the periodic purge (call on application shutdown)"""
+    global _sweeper
+    if _sweeper is not None:
+        _sweeper.cancel()
+        try:
+            await _sweeper
+        except asyncio.CancelledError:
+            pass
+    _sweeper = None
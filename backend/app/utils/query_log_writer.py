@@ -0,0 +1,70 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+from app.models.query_log import QueryLog
+
+logger = logging.getLogger(__name__)
+
+# Query logs are written off the request path, batched into bulk INSERTs
+QUEUE_MAXSIZE = 10000
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 0.05  # Seconds to let a batch accumulate
+
+_queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=QUEUE_MAXSIZE)
+_writer: Optional[asyncio.Task] = None
+
+
+async def log_query(**fields: Any):
+    """Queue a QueryLog row; falls back to a direct insert when the queue is full or not running"""
+    if _writer is not None and not _writer.done():
+        try:
+            _queue.put_nowait(fields)
+            return
+        except asyncio.QueueFull:
+            pass
+    await QueryLog.create(**fields)
+
+
+async def _write_batch(batch: List[Dict[str, Any]]):
+    try:
+        await QueryLog.bulk_create([QueryLog(**fields) for fields in batch])
+    except Exception:
+        logger.exception("Failed to write %d query logs", len(batch))
+
+
+# Queued by stop_query_log_writer to tell the writer to flush and exit
+_STOP = None
+
+
+async def _drain():
+    stopping = False
+    while not stopping:
+        first = await _queue.get()
+        if first is _STOP:
+            break
+        await asyncio.sleep(FLUSH_INTERVAL)
+        
+        batch = [first]
+        while len(batch) < BATCH_SIZE and not _queue.empty():
+            fields = _queue.get_nowait()
+            if fields is _STOP:
+                stopping = True
+                break
+            batch.append(fields)
+        await _write_batch(batch)
+
+
+async def start_query_log_writer():
+    """Start the background writer (call on application startup)"""
+    global _writer
+    if _writer is None or _writer.done():
+        _writer = asyncio.create_task(_drain())
+
+
+async def stop_query_log_writer():
+    """Flush queued logs and stop the background writer (call on application shutdown)"""
+    global _writer
+    if _writer is not None and not _writer.done():
+        await _queue.put(_STOP)
+        await _writer
+    _writer = None
@@ -0,0 +1,87 @@
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+import orjson
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+
+class TTLCache:
+    """In-process cache for idempotent GET results, expiring entries after a fixed TTL"""
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: Dict[Tuple[Hashable, ...], Tuple[float, Any]] = {}
+
+    def get(self, key: Tuple[Hashable, ...]) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        return value
+
+    def set(self, key: Tuple[Hashable, ...], value: Any):
+        if key not in self._entries and len(self._entries) >= self.maxsize:
+            # Evict the oldest entry (dicts keep insertion order)
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, user_id: Hashable):
+        """Drop all entries for a user (keys are tuples starting with user_id)"""
+        user_id = str(user_id)
+        for key in [k for k in self._entries if str(k[0]) == user_id]:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+def should_bypass_cache(request: Request) -> bool:
+    """Honor client `Cache-Control: no-cache` / `no-store` request headers"""
+    cache_control = request.headers.get("cache-control", "").lower()
+    return "no-cache" in cache_control or "no-store" in cache_control
+
+
+def serialize_json(payload: Any) -> bytes:
+    """Serialize a response payload (pydantic model or plain data) to JSON bytes"""
+    if isinstance(payload, BaseModel):
+        payload = payload.model_dump(mode="json")
+    return orjson.dumps(payload)
+
+
+def json_response(body: bytes) -> Response:
+    """Wrap pre-serialized JSON bytes, skipping FastAPI's response_model encoding"""
+    return Response(content=body, media_type="application/json")
+
+
+# Caches for read-heavy endpoints (storing serialized JSON bytes), keyed on (user_id, *normalized params).
+# app_stats_cache instead holds the parts of app stats that writes invalidate, as a dict; its
+# query counts change on every logged query and are never cached
+categories_cache = TTLCache(ttl=15)
+integrated_apps_cache = TTLCache(ttl=30)
+app_stats_cache = TTLCache(ttl=30)
+top_preferences_cache = TTLCache(ttl=30)
+
+# (queries_made, contributions) per (user_id, app_id), feeding the query noise level; new
+# query logs aren't invalidated so the count may lag by up to the TTL
+noise_counts_cache = TTLCache(ttl=60)
+
+
+# Per-user caches; app.utils.cache_invalidation applies invalidations across workers
+_USER_CACHES = (categories_cache, integrated_apps_cache, app_stats_cache, top_preferences_cache, noise_counts_cache)
+
+
+def invalidate_local_user_caches(user_id: Hashable):
+    """Drop this process's cached results for a user"""
+    for cache in _USER_CACHES:
+        cache.invalidate(user_id)
+
+
+def clear_response_caches():
+    """Drop every cached result in this process"""
+    for cache in _USER_CACHES:
+        cache.clear()
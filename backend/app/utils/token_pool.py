@@ -0,0 +1,40 @@
+import base64
+import os
+import threading
+
+# Bytes read from the OS CSPRNG per refill; one syscall serves ~128 32-byte tokens
+POOL_SIZE = 4096
+
+
+class TokenPool:
+    """Buffer of os.urandom bytes handed out in slices, so token generation rarely hits the kernel"""
+
+    def __init__(self, size: int = POOL_SIZE):
+        self.size = size
+        self._buffer = b""
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def take(self, n: int) -> bytes:
+        with self._lock:
+            if self._offset + n > len(self._buffer):
+                self._buffer = os.urandom(max(self.size, n))
+                self._offset = 0
+            chunk = self._buffer[self._offset:self._offset + n]
+            self._offset += n
+        return chunk
+
+    def reset(self):
+        """Discard buffered bytes (a forked child must never reuse its parent's randomness)"""
+        self._buffer = b""
+        self._offset = 0
+        self._lock = threading.Lock()
+
+
+_pool = TokenPool()
+os.register_at_fork(after_in_child=_pool.reset)
+
+
+def token_urlsafe_pooled(nbytes: int = 32) -> str:
+    """Drop-in for secrets.token_urlsafe backed by the shared TokenPool"""
+    return base64.urlsafe_b64encode(_pool.take(nbytes)).rstrip(b"=").decode("ascii")
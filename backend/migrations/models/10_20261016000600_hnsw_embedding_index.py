@@ -0,0 +1,21 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    -- HNSW gives better recall/latency than IVFFlat and needs no training data,
+    -- so it also works on tables that were empty when the index was built
+    DROP INDEX IF EXISTS idx_user_preferences_embedding;
+    CREATE INDEX IF NOT EXISTS idx_up_emb_hnsw ON user_preferences USING hnsw (embedding halfvec_cosine_ops) WITH (m = 16, ef_construction = 64);
+    
+    -- Query logs are append-only and never searched by similarity; an ANN index there only slows inserts
+    DROP INDEX IF EXISTS idx_query_logs_embedding;
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    DROP INDEX IF EXISTS idx_up_emb_hnsw;
+    CREATE INDEX IF NOT EXISTS idx_user_preferences_embedding ON user_preferences USING ivfflat (embedding halfvec_cosine_ops) WITH (lists = 100);
+    CREATE INDEX IF NOT EXISTS idx_query_logs_embedding ON query_logs USING ivfflat (embedding halfvec_cosine_ops) WITH (lists = 100);
+    """
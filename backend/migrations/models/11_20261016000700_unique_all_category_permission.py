@@ -0,0 +1,24 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    -- The (user_id, app_id, category_id) unique constraint treats NULLs as distinct, so
+    -- "all categories" grants (category_id IS NULL) could be duplicated. Keep the newest row.
+    DELETE FROM user_app_permissions a
+    USING user_app_permissions b
+    WHERE a.category_id IS NULL
+      AND b.category_id IS NULL
+      AND a.user_id = b.user_id
+      AND a.app_id = b.app_id
+      AND (a.updated_at, a.id) < (b.updated_at, b.id);
+    
+    CREATE UNIQUE INDEX IF NOT EXISTS uid_user_app_permissions_all_categories
+        ON user_app_permissions (user_id, app_id) WHERE category_id IS NULL;
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    DROP INDEX IF EXISTS uid_user_app_permissions_all_categories;
+    """
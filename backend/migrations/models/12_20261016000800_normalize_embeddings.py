@@ -0,0 +1,16 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    -- Preferences are L2-normalized on write so cosine similarity is a plain dot product;
+    -- normalize existing rows to match (l2_normalize requires pgvector >= 0.7.0)
+    UPDATE user_preferences SET embedding = l2_normalize(embedding) WHERE embedding IS NOT NULL;
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    -- Original magnitudes are not recoverable; normalized embeddings remain valid for cosine search
+    SELECT 1;
+    """
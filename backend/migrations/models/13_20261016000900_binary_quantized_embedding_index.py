@@ -0,0 +1,18 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    -- Nearest-neighbour search shortlists on 1-bit-per-dimension codes (48 bytes per row instead of
+    -- 768) and reranks the shortlist with exact halfvec cosine, so the halfvec graph is no longer used
+    CREATE INDEX IF NOT EXISTS idx_up_emb_bq_hnsw ON user_preferences
+        USING hnsw ((binary_quantize(embedding)::bit(384)) bit_hamming_ops) WITH (m = 16, ef_construction = 64);
+    DROP INDEX IF EXISTS idx_up_emb_hnsw;
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    CREATE INDEX IF NOT EXISTS idx_up_emb_hnsw ON user_preferences USING hnsw (embedding halfvec_cosine_ops) WITH (m = 16, ef_construction = 64);
+    DROP INDEX IF EXISTS idx_up_emb_bq_hnsw;
+    """
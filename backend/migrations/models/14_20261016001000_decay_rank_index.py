@@ -0,0 +1,25 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    -- ln of a preference's decayed strength up to a term that depends only on "now":
+    -- strength * 0.5^((now - last_updated) / half_life) orders the same as this at every instant,
+    -- so top-N by decayed strength is an index scan that never needs rescoring.
+    -- The 14-day half-life must match DECAY_CONFIG["half_life_days"].
+    -- (Declared IMMUTABLE: the epoch of a timestamptz does not depend on the session time zone.)
+    CREATE OR REPLACE FUNCTION preference_decay_rank(strength double precision, last_updated timestamptz)
+    RETURNS double precision LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT ln(greatest(strength, 1e-300)) + ln(2) * EXTRACT(EPOCH FROM last_updated) / (86400 * 14)
+    $$;
+    
+    CREATE INDEX IF NOT EXISTS idx_up_user_category_decay_rank ON user_preferences
+        (user_id, category_id, preference_decay_rank(strength, last_updated) DESC);
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    DROP INDEX IF EXISTS idx_up_user_category_decay_rank;
+    DROP FUNCTION IF EXISTS preference_decay_rank(double precision, timestamptz);
+    """
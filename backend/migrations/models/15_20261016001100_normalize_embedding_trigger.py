@@ -0,0 +1,28 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    -- Similarity search ranks by inner product (<#>), which equals cosine only for unit-length
+    -- vectors; normalize every written embedding, whichever client writes it
+    CREATE OR REPLACE FUNCTION normalize_preference_embedding() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF NEW.embedding IS NOT NULL THEN
+            NEW.embedding := l2_normalize(NEW.embedding);
+        END IF;
+        RETURN NEW;
+    END;
+    $$;
+    
+    DROP TRIGGER IF EXISTS trg_user_preferences_normalize_embedding ON user_preferences;
+    CREATE TRIGGER trg_user_preferences_normalize_embedding
+        BEFORE INSERT OR UPDATE OF embedding ON user_preferences
+        FOR EACH ROW EXECUTE FUNCTION normalize_preference_embedding();
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    DROP TRIGGER IF EXISTS trg_user_preferences_normalize_embedding ON user_preferences;
+    DROP FUNCTION IF EXISTS normalize_preference_embedding();
+    """
@@ -0,0 +1,82 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    -- Range-partition query_logs by month so old months can be detached/dropped instead of
+    -- deleted and vacuumed, and (app_id, user_id, timestamp) lookups only touch live partitions.
+    -- The primary key must include the partition key.
+    ALTER TABLE query_logs RENAME TO query_logs_unpartitioned;
+    ALTER TABLE query_logs_unpartitioned RENAME CONSTRAINT query_logs_pkey TO query_logs_unpartitioned_pkey;
+    ALTER INDEX "idx_query_logs_app_id_8bba60" RENAME TO idx_query_logs_unpartitioned_app_user_ts;
+    
+    CREATE TABLE query_logs (
+        "id" UUID NOT NULL,
+        "result" DOUBLE PRECISION,
+        "context" VARCHAR(500),
+        "noise_level" DOUBLE PRECISION,
+        "timestamp" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        "app_id" UUID NOT NULL REFERENCES "apps" ("id") ON DELETE CASCADE,
+        "user_id" UUID NOT NULL REFERENCES "users" ("id") ON DELETE CASCADE,
+        "embedding" halfvec(384),
+        PRIMARY KEY ("id", "timestamp")
+    ) PARTITION BY RANGE ("timestamp");
+    CREATE INDEX IF NOT EXISTS "idx_query_logs_app_id_8bba60" ON query_logs ("app_id", "user_id", "timestamp");
+    
+    -- Catches rows outside every monthly partition so inserts never fail
+    CREATE TABLE IF NOT EXISTS query_logs_default PARTITION OF query_logs DEFAULT;
+    
+    -- Creates the monthly partitions covering [first_month, last_month]; idempotent.
+    -- The API calls it on startup for the next few months; a cron job can call it too.
+    CREATE OR REPLACE FUNCTION create_query_log_partitions(first_month date, last_month date)
+    RETURNS void LANGUAGE plpgsql AS $$
+    DECLARE
+        month_start date := date_trunc('month', first_month)::date;
+    BEGIN
+        WHILE month_start <= last_month LOOP
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF query_logs FOR VALUES FROM (%L) TO (%L)',
+                'query_logs_' || to_char(month_start, 'YYYY_MM'),
+                month_start,
+                (month_start + interval '1 month')::date
+            );
+            month_start := (month_start + interval '1 month')::date;
+        END LOOP;
+    END;
+    $$;
+    
+    SELECT create_query_log_partitions(
+        COALESCE((SELECT min("timestamp")::date FROM query_logs_unpartitioned), CURRENT_DATE),
+        (CURRENT_DATE + interval '3 months')::date
+    );
+    
+    INSERT INTO query_logs ("id", "result", "context", "noise_level", "timestamp", "app_id", "user_id", "embedding")
+        SELECT "id", "result", "context", "noise_level", "timestamp", "app_id", "user_id", "embedding"
+        FROM query_logs_unpartitioned;
+    DROP TABLE query_logs_unpartitioned;
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    ALTER TABLE query_logs RENAME TO query_logs_partitioned;
+    ALTER INDEX "idx_query_logs_app_id_8bba60" RENAME TO idx_query_logs_partitioned_app_user_ts;
+    
+    CREATE TABLE query_logs (
+        "id" UUID NOT NULL PRIMARY KEY,
+        "result" DOUBLE PRECISION,
+        "context" VARCHAR(500),
+        "noise_level" DOUBLE PRECISION,
+        "timestamp" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        "app_id" UUID NOT NULL REFERENCES "apps" ("id") ON DELETE CASCADE,
+        "user_id" UUID NOT NULL REFERENCES "users" ("id") ON DELETE CASCADE,
+        "embedding" halfvec(384)
+    );
+    CREATE INDEX IF NOT EXISTS "idx_query_logs_app_id_8bba60" ON query_logs ("app_id", "user_id", "timestamp");
+    
+    INSERT INTO query_logs ("id", "result", "context", "noise_level", "timestamp", "app_id", "user_id", "embedding")
+        SELECT "id", "result", "context", "noise_level", "timestamp", "app_id", "user_id", "embedding"
+        FROM query_logs_partitioned;
+    DROP TABLE query_logs_partitioned;
+    DROP FUNCTION IF EXISTS create_query_log_partitions(date, date);
+    """
@@ -0,0 +1,27 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    -- The decay-rank index (migration 14) leads with (user_id, category_id), so the original
+    -- (user_id, category_id) btree is redundant. Rebuild the rank index with strength and
+    -- last_updated included: the planner needs the expression's input columns in the index
+    -- before it will answer rank-filtered counts with an index-only scan.
+    DROP INDEX IF EXISTS idx_up_user_category_decay_rank;
+    CREATE INDEX IF NOT EXISTS idx_up_user_category_decay_rank ON user_preferences
+        (user_id, category_id, preference_decay_rank(strength, last_updated) DESC) INCLUDE (strength, last_updated);
+    DROP INDEX IF EXISTS "idx_user_prefer_user_id_bf0617";
+    
+    -- Index-only scans also need a current visibility map: run VACUUM ANALYZE user_preferences
+    -- after deploying (VACUUM can't run inside the migration transaction)
+    ANALYZE user_preferences;
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    CREATE INDEX IF NOT EXISTS "idx_user_prefer_user_id_bf0617" ON user_preferences (user_id, category_id);
+    DROP INDEX IF EXISTS idx_up_user_category_decay_rank;
+    CREATE INDEX IF NOT EXISTS idx_up_user_category_decay_rank ON user_preferences
+        (user_id, category_id, preference_decay_rank(strength, last_updated) DESC);
+    """
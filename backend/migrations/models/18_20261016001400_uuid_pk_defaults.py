@@ -0,0 +1,23 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    -- Let Postgres generate primary keys for rows inserted outside the ORM (bulk seeding / COPY),
+    -- so clients don't have to build and serialize a UUID per row (gen_random_uuid is core in PG 13+)
+    ALTER TABLE preference_categories ALTER COLUMN id SET DEFAULT gen_random_uuid();
+    ALTER TABLE apps ALTER COLUMN id SET DEFAULT gen_random_uuid();
+    ALTER TABLE user_preferences ALTER COLUMN id SET DEFAULT gen_random_uuid();
+    ALTER TABLE preference_sources ALTER COLUMN id SET DEFAULT gen_random_uuid();
+    ALTER TABLE user_app_permissions ALTER COLUMN id SET DEFAULT gen_random_uuid();
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    ALTER TABLE preference_categories ALTER COLUMN id DROP DEFAULT;
+    ALTER TABLE apps ALTER COLUMN id DROP DEFAULT;
+    ALTER TABLE user_preferences ALTER COLUMN id DROP DEFAULT;
+    ALTER TABLE preference_sources ALTER COLUMN id DROP DEFAULT;
+    ALTER TABLE user_app_permissions ALTER COLUMN id DROP DEFAULT;
+    """
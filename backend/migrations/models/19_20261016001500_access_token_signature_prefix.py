@@ -0,0 +1,16 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    -- Databases that ran migration 8 before it used the signature segment have the shared
+    -- JWT header prefix ("eyJhbGci") on every row; recompute it from the signature
+    UPDATE oauth_access_tokens SET token_prefix = left(substring(token from '[^.]*$'), 8)
+    WHERE token_prefix IS DISTINCT FROM left(substring(token from '[^.]*$'), 8);
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    UPDATE oauth_access_tokens SET token_prefix = left(token, 8);
+    """
@@ -0,0 +1,79 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    -- Rows for a month without a partition land in query_logs_default, after which
+    -- CREATE TABLE ... PARTITION OF for that month fails. Move such rows into the new
+    -- partition before attaching it, and handle each month on its own so one failure
+    -- doesn't stop the later months from being created.
+    CREATE OR REPLACE FUNCTION create_query_log_partitions(first_month date, last_month date)
+    RETURNS void LANGUAGE plpgsql AS $$
+    DECLARE
+        month_start date := date_trunc('month', first_month)::date;
+        month_end date;
+        partition_name text;
+    BEGIN
+        WHILE month_start <= last_month LOOP
+            month_end := (month_start + interval '1 month')::date;
+            partition_name := 'query_logs_' || to_char(month_start, 'YYYY_MM');
+            
+            IF to_regclass(partition_name) IS NULL THEN
+                BEGIN
+                    -- Block inserts into the default partition until the month is attached
+                    LOCK TABLE query_logs_default IN SHARE ROW EXCLUSIVE MODE;
+                    
+                    IF EXISTS (
+                        SELECT 1 FROM query_logs_default
+                        WHERE "timestamp" >= month_start AND "timestamp" < month_end
+                    ) THEN
+                        EXECUTE format(
+                            'CREATE TABLE %I (LIKE query_logs INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                            partition_name
+                        );
+                        EXECUTE format(
+                            'WITH moved AS (DELETE FROM query_logs_default WHERE "timestamp" >= %L AND "timestamp" < %L RETURNING *) '
+                            'INSERT INTO %I SELECT * FROM moved',
+                            month_start, month_end, partition_name
+                        );
+                        EXECUTE format(
+                            'ALTER TABLE query_logs ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                            partition_name, month_start, month_end
+                        );
+                    ELSE
+                        EXECUTE format(
+                            'CREATE TABLE %I PARTITION OF query_logs FOR VALUES FROM (%L) TO (%L)',
+                            partition_name, month_start, month_end
+                        );
+                    END IF;
+                EXCEPTION WHEN OTHERS THEN
+                    RAISE WARNING 'Could not create partition %: %', partition_name, SQLERRM;
+                END;
+            END IF;
+            
+            month_start := month_end;
+        END LOOP;
+    END;
+    $$;
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    CREATE OR REPLACE FUNCTION create_query_log_partitions(first_month date, last_month date)
+    RETURNS void LANGUAGE plpgsql AS $$
+    DECLARE
+        month_start date := date_trunc('month', first_month)::date;
+    BEGIN
+        WHILE month_start <= last_month LOOP
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF query_logs FOR VALUES FROM (%L) TO (%L)',
+                'query_logs_' || to_char(month_start, 'YYYY_MM'),
+                month_start,
+                (month_start + interval '1 month')::date
+            );
+            month_start := (month_start + interval '1 month')::date;
+        END LOOP;
+    END;
+    $$;
+    """
@@ -0,0 +1,24 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    -- Per-app usage counts filter preference_sources by (user_id, app_id)
+    CREATE INDEX IF NOT EXISTS idx_preference_sources_user_app ON preference_sources (user_id, app_id);
+    
+    -- Token issuance looks up existing tokens by (client_id, user_id)
+    CREATE INDEX IF NOT EXISTS idx_oauth_access_tokens_client_user ON oauth_access_tokens (client_id, user_id);
+    
+    -- Expiry scans for token and authorization code cleanup
+    CREATE INDEX IF NOT EXISTS idx_oauth_access_tokens_expires_at ON oauth_access_tokens (expires_at);
+    CREATE INDEX IF NOT EXISTS idx_oauth_authorization_codes_expires_at ON oauth_authorization_codes (expires_at);
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    DROP INDEX IF EXISTS idx_preference_sources_user_app;
+    DROP INDEX IF EXISTS idx_oauth_access_tokens_client_user;
+    DROP INDEX IF EXISTS idx_oauth_access_tokens_expires_at;
+    DROP INDEX IF EXISTS idx_oauth_authorization_codes_expires_at;
+    """
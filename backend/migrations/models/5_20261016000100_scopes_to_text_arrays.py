@@ -0,0 +1,38 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    -- ALTER COLUMN ... USING can't contain a subquery, so unpack jsonb lists via a helper
+    CREATE FUNCTION pg_temp.jsonb_to_text_array(value jsonb) RETURNS text[]
+        LANGUAGE sql IMMUTABLE
+        AS $$ SELECT COALESCE(ARRAY(SELECT jsonb_array_elements_text(value)), '{}'::text[]) $$;
+    
+    -- Store scope and redirect URI lists as text[] so containment checks run in the DB
+    ALTER TABLE oauth_clients ALTER COLUMN redirect_uris TYPE text[] USING pg_temp.jsonb_to_text_array(redirect_uris);
+    ALTER TABLE oauth_clients ALTER COLUMN allowed_scopes TYPE text[] USING pg_temp.jsonb_to_text_array(allowed_scopes);
+    ALTER TABLE oauth_authorization_codes ALTER COLUMN scopes TYPE text[] USING pg_temp.jsonb_to_text_array(scopes);
+    ALTER TABLE oauth_access_tokens ALTER COLUMN scopes TYPE text[] USING pg_temp.jsonb_to_text_array(scopes);
+    ALTER TABLE oauth_refresh_tokens ALTER COLUMN scopes TYPE text[] USING pg_temp.jsonb_to_text_array(scopes);
+    
+    -- GIN indexes for `scopes @> ARRAY[...]` containment checks
+    CREATE INDEX IF NOT EXISTS idx_oauth_clients_allowed_scopes ON oauth_clients USING GIN (allowed_scopes);
+    CREATE INDEX IF NOT EXISTS idx_oauth_authorization_codes_scopes ON oauth_authorization_codes USING GIN (scopes);
+    CREATE INDEX IF NOT EXISTS idx_oauth_access_tokens_scopes ON oauth_access_tokens USING GIN (scopes);
+    CREATE INDEX IF NOT EXISTS idx_oauth_refresh_tokens_scopes ON oauth_refresh_tokens USING GIN (scopes);
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    DROP INDEX IF EXISTS idx_oauth_clients_allowed_scopes;
+    DROP INDEX IF EXISTS idx_oauth_authorization_codes_scopes;
+    DROP INDEX IF EXISTS idx_oauth_access_tokens_scopes;
+    DROP INDEX IF EXISTS idx_oauth_refresh_tokens_scopes;
+    
+    ALTER TABLE oauth_clients ALTER COLUMN redirect_uris TYPE jsonb USING to_jsonb(redirect_uris);
+    ALTER TABLE oauth_clients ALTER COLUMN allowed_scopes TYPE jsonb USING to_jsonb(allowed_scopes);
+    ALTER TABLE oauth_authorization_codes ALTER COLUMN scopes TYPE jsonb USING to_jsonb(scopes);
+    ALTER TABLE oauth_access_tokens ALTER COLUMN scopes TYPE jsonb USING to_jsonb(scopes);
+    ALTER TABLE oauth_refresh_tokens ALTER COLUMN scopes TYPE jsonb USING to_jsonb(scopes);
+    """
@@ -0,0 +1,15 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    -- Refresh token lookups always filter on revoked = false; revoked rows accumulate
+    -- over time, so a partial index keeps the live set small and cache-resident
+    CREATE INDEX IF NOT EXISTS idx_refresh_active ON oauth_refresh_tokens (token, expires_at) WHERE revoked = false;
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    DROP INDEX IF EXISTS idx_refresh_active;
+    """
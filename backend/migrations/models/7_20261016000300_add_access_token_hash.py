@@ -0,0 +1,22 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    -- Look up access tokens by a 64-char SHA-256 digest instead of the full JWT
+    ALTER TABLE oauth_access_tokens ADD COLUMN token_hash VARCHAR(64);
+    UPDATE oauth_access_tokens SET token_hash = encode(sha256(convert_to(token, 'UTF8')), 'hex');
+    ALTER TABLE oauth_access_tokens ALTER COLUMN token_hash SET NOT NULL;
+    CREATE UNIQUE INDEX IF NOT EXISTS uid_oauth_access_tokens_token_hash ON oauth_access_tokens (token_hash);
+    
+    -- The full token is kept for display only, so drop its (large) unique index
+    ALTER TABLE oauth_access_tokens DROP CONSTRAINT IF EXISTS oauth_access_tokens_token_key;
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    ALTER TABLE oauth_access_tokens ADD CONSTRAINT oauth_access_tokens_token_key UNIQUE (token);
+    DROP INDEX IF EXISTS uid_oauth_access_tokens_token_hash;
+    ALTER TABLE oauth_access_tokens DROP COLUMN token_hash;
+    """
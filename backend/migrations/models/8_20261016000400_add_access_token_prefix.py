@@ -0,0 +1,19 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    -- Short token prefix for display and admin search without transferring the full JWT;
+    -- taken from the signature segment, since every token starts with the same JWT header
+    ALTER TABLE oauth_access_tokens ADD COLUMN token_prefix VARCHAR(12);
+    UPDATE oauth_access_tokens SET token_prefix = left(substring(token from '[^.]*$'), 8);
+    ALTER TABLE oauth_access_tokens ALTER COLUMN token_prefix SET NOT NULL;
+    CREATE INDEX IF NOT EXISTS idx_oauth_access_tokens_token_prefix ON oauth_access_tokens (token_prefix);
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    DROP INDEX IF EXISTS idx_oauth_access_tokens_token_prefix;
+    ALTER TABLE oauth_access_tokens DROP COLUMN token_prefix;
+    """
@@ -0,0 +1,29 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    -- Store embeddings as float16 halfvec (requires pgvector >= 0.7.0): 768 instead of 1536 bytes per row
+    -- vector_cosine_ops doesn't apply to halfvec, so rebuild the indexes around the type change
+    DROP INDEX IF EXISTS idx_user_preferences_embedding;
+    DROP INDEX IF EXISTS idx_query_logs_embedding;
+    
+    ALTER TABLE user_preferences ALTER COLUMN embedding TYPE halfvec(384) USING embedding::halfvec(384);
+    ALTER TABLE query_logs ALTER COLUMN embedding TYPE halfvec(384) USING embedding::halfvec(384);
+    
+    CREATE INDEX IF NOT EXISTS idx_user_preferences_embedding ON user_preferences USING ivfflat (embedding halfvec_cosine_ops) WITH (lists = 100);
+    CREATE INDEX IF NOT EXISTS idx_query_logs_embedding ON query_logs USING ivfflat (embedding halfvec_cosine_ops) WITH (lists = 100);
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+    DROP INDEX IF EXISTS idx_user_preferences_embedding;
+    DROP INDEX IF EXISTS idx_query_logs_embedding;
+    
+    ALTER TABLE user_preferences ALTER COLUMN embedding TYPE vector(384) USING embedding::vector(384);
+    ALTER TABLE query_logs ALTER COLUMN embedding TYPE vector(384) USING embedding::vector(384);
+    
+    CREATE INDEX IF NOT EXISTS idx_user_preferences_embedding ON user_preferences USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
+    CREATE INDEX IF NOT EXISTS idx_query_logs_embedding ON query_logs USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
+    """
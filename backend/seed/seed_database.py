@@ -5,6 +5,7 @@ Database seeding script for Vault backend
 import asyncio
 import json
 import os
+import struct
 import sys
 from pathlib import Path
 from uuid import uuid4
@@ -22,7 +23,6 @@ from app.models.user_app_permission import UserAppPermission
 from app.models.preference_source import PreferenceSource
 from app.models.oauth_client import OAuthClient
 import numpy as np
-import random
 
 load_dotenv()
 
@@ -51,6 +51,26 @@ TORTOISE_ORM = {
 }
 
 
+# Insert-if-missing in one statement; RETURNING reports only the rows actually created
+INSERT_CATEGORIES_SQL = """
+    INSERT INTO preference_categories (name, slug, description)
+    SELECT name, slug, description
+    FROM unnest($1::text[], $2::text[], $3::text[]) AS c(name, slug, description)
+    ON CONFLICT DO NOTHING
+    RETURNING name
+"""
+
+# Apps are skipped when either the name or the API key is already taken
+INSERT_APPS_SQL = """
+    INSERT INTO apps (name, description, api_key, is_active)
+    SELECT a.name, a.description, a.api_key, true
+    FROM unnest($1::text[], $2::text[], $3::text[]) AS a(name, description, api_key)
+    WHERE NOT EXISTS (SELECT 1 FROM apps WHERE apps.name = a.name)
+    ON CONFLICT DO NOTHING
+    RETURNING name, api_key
+"""
+
+
 async def seed_categories():
     """Seed preference categories"""
     print("🗂️  Seeding preference categories...")
@@ -59,24 +79,23 @@ async def seed_categories():
     with open("seed/data/categories.json", "r") as f:
         categories_data = json.load(f)
     
-    created_count = 0
-    for category_data in categories_data:
-        # Check if category already exists
-        existing = await PreferenceCategory.filter(slug=category_data["slug"]).first()
-        if existing:
-            print(f"   ↪ Category '{category_data['name']}' already exists, skipping...")
-            continue
-        
-        # Create new category
-        category = await PreferenceCategory.create(
-            id=uuid4(),
-            name=category_data["name"],
-            slug=category_data["slug"],
-            description=category_data["description"]
-        )
-        print(f"   ✅ Created category: {category.name}")
-        created_count += 1
+    # Create all missing categories at once; existing slugs/names are left untouched
+    created = await Tortoise.get_connection("default").execute_query_dict(
+        INSERT_CATEGORIES_SQL,
+        [
+            [category_data["name"] for category_data in categories_data],
+            [category_data["slug"] for category_data in categories_data],
+            [category_data["description"] for category_data in categories_data]
+        ]
+    )
+    for row in created:
+        print(f"   ✅ Created category: {row['name']}")
+    
+    skipped_count = len(categories_data) - len(created)
+    if skipped_count:
+        print(f"   ↪ {skipped_count} categories already exist, skipped")
     
+    created_count = len(created)
     print(f"📊 Created {created_count} new categories")
     return created_count
 
@@ -89,26 +108,23 @@ async def seed_apps():
     with open("seed/data/apps.json", "r") as f:
         apps_data = json.load(f)
     
-    created_count = 0
-    for app_data in apps_data:
-        # Check if app already exists (by name or API key)
-        existing = await App.filter(name=app_data["name"]).first()
-        existing_key = await App.filter(api_key=app_data["api_key"]).first()
-        if existing or existing_key:
-            print(f"   ↪ App '{app_data['name']}' already exists, skipping...")
-            continue
-        
-        # Create new app
-        app = await App.create(
-            id=uuid4(),
-            name=app_data["name"],
-            description=app_data["description"],
-            api_key=app_data["api_key"],
-            is_active=True
-        )
-        print(f"   ✅ Created app: {app.name} (API Key: {app.api_key})")
-        created_count += 1
+    # Create all missing apps at once
+    created = await Tortoise.get_connection("default").execute_query_dict(
+        INSERT_APPS_SQL,
+        [
+            [app_data["name"] for app_data in apps_data],
+            [app_data["description"] for app_data in apps_data],
+            [app_data["api_key"] for app_data in apps_data]
+        ]
+    )
+    for row in created:
+        print(f"   ✅ Created app: {row['name']} (API Key: {row['api_key']})")
     
+    skipped_count = len(apps_data) - len(created)
+    if skipped_count:
+        print(f"   ↪ {skipped_count} apps already exist, skipped")
+    
+    created_count = len(created)
     print(f"📊 Created {created_count} new apps")
     return created_count
 
@@ -152,9 +168,49 @@ async def seed_oauth_clients():
     return created_count
 
 
-def generate_mock_embedding():
-    """Generate a mock 1536-dimensional embedding vector"""
-    return np.random.normal(0, 1, 1536).tolist()
+# Seeded PCG64 generator so mock data is reproducible across runs
+_RNG = np.random.default_rng(42)
+
+
+def generate_mock_embeddings(count: int) -> np.ndarray:
+    """Generate `count` mock 384-dimensional embeddings, unit length like stored preferences"""
+    # Draw straight into float32 and normalize in place - no float64 intermediate or copies
+    embeddings = _RNG.standard_normal((count, 384), dtype=np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings
+
+
+def encode_halfvec(embedding) -> bytes:
+    """pgvector halfvec binary format: int16 dimensions, int16 unused, big-endian float16 values"""
+    values = np.asarray(embedding, dtype=">f2")
+    return struct.pack(">HH", values.shape[0], 0) + values.tobytes()
+
+
+def decode_halfvec(data: bytes) -> list:
+    """Inverse of encode_halfvec"""
+    dimensions, _ = struct.unpack_from(">HH", data)
+    return np.frombuffer(data, dtype=">f2", count=dimensions, offset=4).astype(np.float32).tolist()
+
+
+async def copy_preferences(records: list):
+    """Insert (user_id, category_id, text, embedding, strength) rows with binary COPY.
+
+    Embeddings go over the wire as packed float16, so the server never parses vector text;
+    ids come from the column default (migration 18).
+    """
+    async with Tortoise.get_connection("default").acquire_connection() as connection:
+        await connection.set_type_codec(
+            "halfvec", schema="public", encoder=encode_halfvec, decoder=decode_halfvec, format="binary"
+        )
+        try:
+            await connection.copy_records_to_table(
+                "user_preferences",
+                records=records,
+                columns=["user_id", "category_id", "text", "embedding", "strength"]
+            )
+        finally:
+            # The connection goes back to Tortoise's pool, which expects halfvec as text
+            await connection.reset_type_codec("halfvec", schema="public")
 
 
 async def seed_demo_user_and_preferences():
@@ -182,11 +238,13 @@ async def seed_demo_user_and_preferences():
     with open("seed/data/sample_preferences.json", "r") as f:
         preferences_data = json.load(f)
     
-    created_count = 0
-    
     # Get all categories for mapping
     categories = {cat.slug: cat for cat in await PreferenceCategory.all()}
     
+    # Get the demo user's existing preference texts in one query
+    existing_texts = set(await UserPreference.filter(user=demo_user).values_list("text", flat=True))
+    
+    new_preferences = []
     for category_slug, prefs in preferences_data.items():
         if category_slug not in categories:
             print(f"   ⚠️  Warning: Category '{category_slug}' not found, skipping...")
@@ -195,25 +253,21 @@ async def seed_demo_user_and_preferences():
         category = categories[category_slug]
         
         for pref_data in prefs:
-            # Check if preference already exists for this user
-            existing = await UserPreference.filter(
-                user=demo_user,
-                text=pref_data["text"]
-            ).first()
-            
-            if existing:
+            # Skip preferences this user already has
+            if pref_data["text"] in existing_texts:
                 continue
             
-            # Create new preference with mock embedding
-            await UserPreference.create(
-                id=uuid4(),
-                user=demo_user,
-                category=category,
-                text=pref_data["text"],
-                embedding=generate_mock_embedding(),
-                strength=pref_data["strength"]
-            )
-            created_count += 1
+            existing_texts.add(pref_data["text"])
+            new_preferences.append((category, pref_data))
+    
+    # Create all new preferences with mock embeddings in a single binary COPY
+    if new_preferences:
+        embeddings = generate_mock_embeddings(len(new_preferences))
+        await copy_preferences([
+            (demo_user.id, category.id, pref_data["text"], embedding, pref_data["strength"])
+            for (category, pref_data), embedding in zip(new_preferences, embeddings)
+        ])
+    created_count = len(new_preferences)
     
     print(f"📊 Created {created_count} new preferences for demo user")
     return created_count
@@ -227,10 +281,16 @@ async def seed_app_integrations_for_user(user_id: str):
     user = await User.get(id=user_id)
     apps = await App.all()
     categories = await PreferenceCategory.all()
-    user_preferences = await UserPreference.filter(user=user).all()
+    categories_by_slug = {category.slug: category for category in categories}
+    category_slugs_by_id = {category.id: category.slug for category in categories}
+    user_preferences = await UserPreference.filter(user=user).values_list("id", "category_id")
     
-    permissions_created = 0
-    sources_created = 0
+    # Get existing permissions and sources up front instead of probing per row
+    existing_permissions = set(await UserAppPermission.filter(user=user).values_list("app_id", "category_id"))
+    existing_sources = set(await PreferenceSource.filter(user=user).values_list("preference_id", "app_id"))
+    
+    new_permissions = []
+    new_sources = []
     
     # Create realistic app permissions for each app
     app_permissions = {
@@ -245,48 +305,53 @@ async def seed_app_integrations_for_user(user_id: str):
         if app.name in app_permissions:
             # Grant permissions for specific categories
             for category_slug in app_permissions[app.name]:
-                category = next((c for c in categories if c.slug == category_slug), None)
-                if category:
-                    # Check if permission already exists
-                    existing = await UserAppPermission.filter(
-                        user=user, app=app, category=category
-                    ).first()
-                    
-                    if not existing:
-                        await UserAppPermission.create(
-                            id=uuid4(),
-                            user=user,
-                            app=app,
-                            category=category,
-                            can_read=True,
-                            can_write=True if random.random() > 0.3 else False  # 70% get write access
-                        )
-                        permissions_created += 1
+                category = categories_by_slug.get(category_slug)
+                if category and (app.id, category.id) not in existing_permissions:
+                    existing_permissions.add((app.id, category.id))
+                    new_permissions.append(UserAppPermission(
+                        id=uuid4(),
+                        user=user,
+                        app=app,
+                        category=category,
+                        can_read=True,
+                        can_write=False  # Drawn for all new permissions at once below
+                    ))
             
             # Create some preference sources (simulate apps contributing preferences)
-            # Load categories with relations
-            relevant_prefs = []
-            for pref in user_preferences:
-                if pref.category_id:
-                    pref_category = await PreferenceCategory.get(id=pref.category_id)
-                    if pref_category.slug in app_permissions[app.name]:
-                        relevant_prefs.append(pref)
+            relevant_pref_ids = [
+                pref_id for pref_id, category_id in user_preferences
+                if category_id and category_slugs_by_id.get(category_id) in app_permissions[app.name]
+            ]
             
             # Randomly assign some preferences as contributed by this app
-            for pref in random.sample(relevant_prefs, min(2, len(relevant_prefs))):
-                existing_source = await PreferenceSource.filter(
-                    preference=pref, app=app, user=user
-                ).first()
-                
-                if not existing_source:
-                    await PreferenceSource.create(
+            sampled = _RNG.choice(len(relevant_pref_ids), size=min(2, len(relevant_pref_ids)), replace=False)
+            for pref_id in (relevant_pref_ids[i] for i in sampled):
+                if (pref_id, app.id) not in existing_sources:
+                    existing_sources.add((pref_id, app.id))
+                    new_sources.append(PreferenceSource(
                         id=uuid4(),
-                        preference=pref,
+                        preference_id=pref_id,
                         app=app,
-                        user=user,
-                        strength=round(random.uniform(0.5, 2.0), 1)
-                    )
-                    sources_created += 1
+                        user=user
+                    ))
+    
+    # Draw every random attribute in one vectorized call per table
+    write_flags = _RNG.random(len(new_permissions)) > 0.3  # 70% get write access
+    for permission, can_write in zip(new_permissions, write_flags):
+        permission.can_write = bool(can_write)
+    
+    strengths = np.round(_RNG.uniform(0.5, 2.0, len(new_sources)), 1)
+    for source, strength in zip(new_sources, strengths):
+        source.strength = float(strength)
+    
+    # Insert everything in one statement per table; unique constraints dedupe concurrent runs
+    if new_permissions:
+        await UserAppPermission.bulk_create(new_permissions, ignore_conflicts=True)
+    if new_sources:
+        await PreferenceSource.bulk_create(new_sources, ignore_conflicts=True)
+    
+    permissions_created = len(new_permissions)
+    sources_created = len(new_sources)
     
     print(f"📊 Created {permissions_created} app permissions")
     print(f"📊 Created {sources_created} preference sources")
@@ -6,6 +6,7 @@ Runs with more logging to help debug system tray issues.
 """
 import sys
 import os
+import importlib.util
 from pathlib import Path
 
 # Add src directory to Python path
@@ -13,22 +14,14 @@ src_dir = Path(__file__).parent / "src"
 sys.path.insert(0, str(src_dir))
 
 def check_tray_support():
-    """Check if system tray is supported"""
-    try:
-        import pystray
-        print("✅ pystray imported successfully")
-        
-        # Try to create a simple icon to test
-        from PIL import Image, ImageDraw
-        
-        # Create a simple test image
-        image = Image.new('RGBA', (64, 64), (138, 92, 246, 255))  # Purple
-        print("✅ PIL image created successfully")
-        
-        return True
-    except Exception as e:
-        print(f"❌ System tray support check failed: {e}")
+    """Check if system tray dependencies are installed (without importing them)"""
+    missing = [name for name in ("pystray", "PIL") if importlib.util.find_spec(name) is None]
+    if missing:
+        print(f"❌ System tray support check failed: missing {', '.join(missing)}")
         return False
+    
+    print("✅ pystray and PIL available")
+    return True
 
 def main():
     """Run simplified desktop app"""
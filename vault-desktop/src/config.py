@@ -12,36 +12,59 @@ logger = logging.getLogger(__name__)
 class VaultConfig:
     """Manages configuration for Vault desktop app and MCP server"""
     
+    # ~/.vault only needs creating once per process
+    _dir_ensured = False
+    
     def __init__(self):
         self.config_dir = Path.home() / ".vault"
         self.config_file = self.config_dir / "config.json"
+        
+        # Parsed config.json, reused until the file's mtime/size changes
+        self._cache: Optional[Dict[str, Any]] = None
+        self._cache_key: Optional[tuple] = None
+        
         self.ensure_config_dir()
         
     def ensure_config_dir(self):
         """Ensure config directory exists"""
+        if VaultConfig._dir_ensured:
+            return
         self.config_dir.mkdir(exist_ok=True)
+        VaultConfig._dir_ensured = True
         
     def load_config(self) -> Dict[str, Any]:
         """Load configuration from file"""
-        if not self.config_file.exists():
-            return self.get_default_config()
-            
         try:
+            # A single stat both checks the file exists and validates the cache
+            cache_key = self._stat_key()
+            if self._cache is not None and cache_key == self._cache_key:
+                return self._cache
+            
             with open(self.config_file) as f:
                 config = json.load(f)
                 # Merge with defaults to ensure all keys exist
                 default_config = self.get_default_config()
                 default_config.update(config)
-                return default_config
+            
+            self._cache, self._cache_key = default_config, cache_key
+            return default_config
+        except FileNotFoundError:
+            return self.get_default_config()
         except Exception as e:
             logger.error(f"Failed to load config: {e}")
             return self.get_default_config()
     
+    def _stat_key(self) -> tuple:
+        """Identify the current config file contents by modification time and size"""
+        st = os.stat(self.config_file)
+        return (st.st_mtime_ns, st.st_size)
+    
     def save_config(self, config: Dict[str, Any]):
         """Save configuration to file"""
         try:
             with open(self.config_file, 'w') as f:
                 json.dump(config, f, indent=2)
+            self._cache, self._cache_key = config, self._stat_key()
             logger.info("Configuration saved successfully")
         except Exception as e:
             logger.error(f"Failed to save config: {e}")
@@ -89,7 +112,7 @@ class VaultConfig:
     
     def set(self, key: str, value: Any):
         """Set configuration value"""
-        config = self.load_config()
+        config = dict(self.load_config())
         config[key] = value
         self.save_config(config)
     
@@ -105,7 +128,7 @@ class VaultConfig:
     
     def save_oauth_tokens(self, access_token: str, refresh_token: str, expires_at: int, user_id: str):
         """Save OAuth tokens"""
-        config = self.load_config()
+        config = dict(self.load_config())
         config.update({
             "access_token": access_token,
             "refresh_token": refresh_token,
@@ -117,7 +140,7 @@ class VaultConfig:
     
     def clear_oauth_tokens(self):
         """Clear OAuth tokens (logout)"""
-        config = self.load_config()
+        config = dict(self.load_config())
         config.update({
             "access_token": "",
             "refresh_token": "",
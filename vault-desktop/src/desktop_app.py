@@ -7,43 +7,82 @@ for universal AI tool integration with Vault preferences.
 """
 import sys
 import os
+import signal
 import subprocess
 import threading
 import time
 import tkinter as tk
 from tkinter import messagebox, simpledialog
 from pathlib import Path
-from PIL import Image, ImageDraw
-import pystray
-from pystray import MenuItem as item
+from typing import TYPE_CHECKING
 import logging
 import argparse
 from oauth_client import VaultOAuthClient
 from config import config
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
+# pystray and Pillow are slow to import (platform backends, C extensions), so they
+# are imported where the tray icon is built rather than at startup
+if TYPE_CHECKING:
+    from PIL import Image
+
+# Log records are queued and written by a listener thread, set up when the app is created
+_log_listener = None
+
+
+def setup_logging():
+    """Route logging through a queue to the file and stderr handlers (idempotent)"""
+    global _log_listener
+    if _log_listener is not None:
+        return
+    
+    import atexit
+    import queue
+    from logging.handlers import QueueHandler, QueueListener
+    
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handlers = [
         logging.FileHandler(Path.home() / ".vault" / "app.log"),
         logging.StreamHandler(sys.stderr)
     ]
-)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    
+    log_queue = queue.Queue()
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(QueueHandler(log_queue))
+    
+    _log_listener = QueueListener(log_queue, *handlers)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)  # Flushes queued records on exit
+
 logger = logging.getLogger(__name__)
 
 class VaultDesktopApp:
     """Main desktop application class"""
     
+    # Seconds to reuse the last MCP server liveness check
+    MCP_STATUS_TTL = 1.0
+    
+    # Rendered tray icons by color; only a handful of colors are ever drawn
+    _icon_cache = {}
+    
     def __init__(self):
+        setup_logging()
         self.oauth_client = VaultOAuthClient()
         self.mcp_server_process = None
+        
+        # is_mcp_server_running result, reused for MCP_STATUS_TTL seconds; cleared on SIGCHLD (POSIX)
+        self._mcp_alive_cached = None
+        self._mcp_cache_ts = 0.0
         self.icon = None
-        self.running = True
+        self._stop_event = threading.Event()  # Set on quit; wakes the background threads immediately
         
         # Status tracking
         self.authenticated = False
         self.mcp_server_running = False
+        self._last_status = None  # (authenticated, mcp_server_running) last shown on the icon
+        self._menus = {}  # Tray menus by (authenticated, mcp_server_running), built in run()
         
         # Privacy seed management
         self.config_dir = Path.home() / ".vault"
@@ -52,8 +91,13 @@ class VaultDesktopApp:
         
         logger.info("Vault Desktop App initialized")
     
-    def create_icon_image(self, color: str = "purple") -> Image.Image:
+    def create_icon_image(self, color: str = "purple") -> "Image.Image":
         """Create system tray icon image"""
+        if color in self._icon_cache:
+            return self._icon_cache[color]
+        
+        from PIL import Image, ImageDraw
+        
         # Create a 64x64 icon with Vault logo
         icon_size = 64
         image = Image.new('RGBA', (icon_size, icon_size), (0, 0, 0, 0))
@@ -80,6 +124,7 @@ class VaultDesktopApp:
         shackle_rect = [margin + 12, margin, icon_size - margin - 12, margin + 24]
         draw.arc(shackle_rect, 0, 180, fill=icon_color, width=4)
         
+        self._icon_cache[color] = image
         return image
     
     def prompt_for_privacy_seed(self) -> bool:
@@ -208,9 +253,19 @@ class VaultDesktopApp:
             logger.error(f"Failed to cleanup temp files: {e}")
     
     def create_menu(self):
-        """Create system tray context menu"""
+        """Get the system tray context menu for the current status"""
+        status = (self.authenticated, self.mcp_server_running)
+        if status not in self._menus:
+            self._menus[status] = self._build_menu(*status)
+        return self._menus[status]
+    
+    def _build_menu(self, authenticated: bool, mcp_server_running: bool):
+        """Build the system tray context menu for a given status"""
+        import pystray
+        from pystray import MenuItem as item
+        
         # Dynamic menu based on authentication status
-        if self.authenticated:
+        if authenticated:
             auth_item = item('✅ Authenticated', None, enabled=False)
             auth_action = item('Logout', self.logout)
         else:
@@ -218,7 +273,7 @@ class VaultDesktopApp:
             auth_action = item('Login to Vault', self.login)
         
         # MCP Server status
-        if self.mcp_server_running:
+        if mcp_server_running:
             mcp_item = item('🟢 MCP Server Running', None, enabled=False)
             mcp_action = item('Restart MCP Server', self.restart_mcp_server)
         else:
@@ -252,8 +307,10 @@ class VaultDesktopApp:
         else:
             icon_color = "red"  # Not authenticated
         
-        # Update icon and menu
-        if self.icon:
+        # Update icon and menu, only when the status shown on them changed
+        status = (self.authenticated, self.mcp_server_running)
+        if self.icon and status != self._last_status:
+            self._last_status = status
             self.icon.icon = self.create_icon_image(icon_color)
             self.icon.menu = self.create_menu()
     
@@ -281,29 +338,6 @@ class VaultDesktopApp:
         thread = threading.Thread(target=login_thread)
         thread.daemon = True
         thread.start()
-        
-        # Start rapid polling for auth status during login flow
-        def poll_auth_status():
-            """Poll authentication status more frequently during login"""
-            for _ in range(120):  # Poll for up to 2 minutes (120 * 1 second)
-                if not self.running:
-                    break
-                
-                # Check if authentication status changed
-                current_auth = self.oauth_client.is_authenticated()
-                if current_auth != self.authenticated:
-                    logger.info(f"Authentication status changed: {current_auth}")
-                    self.update_status()
-                    if current_auth and config.get("mcp_server_enabled", True):
-                        self.start_mcp_server()
-                    break
-                
-                time.sleep(1)  # Check every second during login
-        
-        # Start polling thread
-        poll_thread = threading.Thread(target=poll_auth_status)
-        poll_thread.daemon = True
-        poll_thread.start()
     
     def logout(self, icon=None, item=None):
         """Logout and clear tokens"""
@@ -332,6 +366,7 @@ class VaultDesktopApp:
                 python_path, str(server_script)
             ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
             
+            self._invalidate_mcp_status()
             logger.info(f"MCP server started with PID {self.mcp_server_process.pid}")
             self.update_status()
             
@@ -352,6 +387,7 @@ class VaultDesktopApp:
                 logger.error(f"Error stopping MCP server: {e}")
             finally:
                 self.mcp_server_process = None
+                self._invalidate_mcp_status()
                 self.update_status()
     
     def restart_mcp_server(self, icon=None, item=None):
@@ -363,12 +399,22 @@ class VaultDesktopApp:
     
     def is_mcp_server_running(self) -> bool:
         """Check if MCP server process is running"""
-        if self.mcp_server_process is None:
+        process = self.mcp_server_process
+        if process is None:
             return False
         
+        now = time.monotonic()
+        if self._mcp_alive_cached is not None and now - self._mcp_cache_ts < self.MCP_STATUS_TTL:
+            return self._mcp_alive_cached
+        
         # Check if process is still alive
-        poll = self.mcp_server_process.poll()
-        return poll is None
+        alive = process.poll() is None
+        self._mcp_alive_cached, self._mcp_cache_ts = alive, now
+        return alive
+    
+    def _invalidate_mcp_status(self, *args):
+        """Forget the cached MCP server status (also used as the SIGCHLD handler)"""
+        self._mcp_alive_cached = None
     
     def open_dashboard(self, icon=None, item=None):
         """Open Vault web dashboard"""
@@ -391,7 +437,7 @@ class VaultDesktopApp:
     def quit_app(self, icon=None, item=None):
         """Quit the application"""
         logger.info("Quitting Vault Desktop App")
-        self.running = False
+        self._stop_event.set()
         self.stop_mcp_server()
         
         if self.icon:
@@ -399,7 +445,7 @@ class VaultDesktopApp:
     
     def status_monitor(self):
         """Background thread to monitor status and refresh tokens"""
-        while self.running:
+        while not self._stop_event.is_set():
             try:
                 # Check if tokens need refresh
                 if self.authenticated and config.needs_token_refresh():
@@ -435,13 +481,15 @@ class VaultDesktopApp:
                 logger.error(f"Status monitor error: {e}")
             
             # Wait 2 seconds before next check (faster responsiveness for seed prompts)
-            for _ in range(2):
-                if not self.running:
-                    break
-                time.sleep(1)
+            if self._stop_event.wait(2):
+                break
     
     def run(self):
         """Run the desktop application"""
+        # Notice MCP server exits immediately on POSIX (handlers can only be installed from the main thread)
+        if hasattr(signal, "SIGCHLD") and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGCHLD, self._invalidate_mcp_status)
+        
         logger.info("Starting Vault Desktop App")
         
         # Initialize status
@@ -456,7 +504,12 @@ class VaultDesktopApp:
         if self.authenticated and config.get("mcp_server_enabled", True):
             self.start_mcp_server()
         
-        # Create and run system tray icon
+        # Create and run system tray icon; the four possible menus are built once up front
+        import pystray
+        self._menus = {
+            (authenticated, mcp_server_running): self._build_menu(authenticated, mcp_server_running)
+            for authenticated in (False, True) for mcp_server_running in (False, True)
+        }
         self.icon = pystray.Icon(
             "vault",
             icon=self.create_icon_image("purple"),